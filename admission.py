@@ -0,0 +1,185 @@
+# admission.py
+"""Admission control for Claude calls.
+
+At most LLM_CONCURRENCY Claude calls run at once per process. Further
+requests wait in a queue of at most ADMISSION_QUEUE_SIZE for up to
+ADMISSION_MAX_WAIT seconds; past either bound they are rejected with
+``Overloaded`` (a 429 with Retry-After at the endpoints) instead of piling
+up behind slow calls until the proxy times out. Cached and coalesced
+answers make no Claude call and are never queued.
+
+The limit applies per controller: the SupportSystem's AdmissionController
+for app.py's threads, or async_app's AsyncAdmissionController for its event
+loop (which sends every Claude call through it, leaving the SupportSystem's
+idle). A sync gunicorn worker only ever has one request. The in-flight and
+queue gauges are labelled with the controller they count.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+from metrics import LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT_SECONDS, LLM_REJECTED
+
+LLM_CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', '8'))
+# Requests allowed to wait for a slot; 0 rejects as soon as all slots are busy
+ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', '32'))
+# Seconds a request may wait for a slot before it is rejected
+ADMISSION_MAX_WAIT = float(os.getenv('ADMISSION_MAX_WAIT', '10'))
+# Weight of the latest call in the running average hold time (Retry-After)
+_HOLD_SMOOTHING = 0.2
+
+
+class Overloaded(Exception):
+    """No Claude slot available; retry after ``retry_after`` seconds"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Service is at capacity ({reason.replace('_', ' ')}), retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Admission:
+    # Label of this controller's in-flight and queue-depth gauges
+    kind = None
+
+    def __init__(self, limit: int = LLM_CONCURRENCY, max_queue: int = ADMISSION_QUEUE_SIZE,
+                 max_wait: float = ADMISSION_MAX_WAIT):
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        # Running average of how long a call holds its slot
+        self.average_hold = None
+        LLM_IN_FLIGHT.set(0, controller=self.kind)
+        LLM_QUEUE_DEPTH.set(0, controller=self.kind)
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead of a new request has likely drained"""
+        hold = self.average_hold or 1.0
+        return max(1, math.ceil(hold * (self.waiting + 1) / self.limit))
+
+    def _wait_limit(self, max_wait: Optional[float]) -> float:
+        return self.max_wait if max_wait is None else max(0.0, min(self.max_wait, max_wait))
+
+    def full(self) -> bool:
+        return self.active >= self.limit and self.waiting >= self.max_queue
+
+    def _reject(self, reason: str, waited: float = 0.0):
+        self.rejected += 1
+        LLM_REJECTED.inc(reason=reason)
+        LLM_QUEUE_WAIT_SECONDS.observe(waited)
+        raise Overloaded(reason, self.retry_after())
+
+    def _admit(self, waited: float):
+        self.active += 1
+        self.admitted += 1
+        LLM_IN_FLIGHT.inc(controller=self.kind)
+        LLM_QUEUE_WAIT_SECONDS.observe(waited)
+
+    def _release(self, held: float):
+        self.active -= 1
+        LLM_IN_FLIGHT.dec(controller=self.kind)
+        if self.average_hold is None:
+            self.average_hold = held
+        else:
+            self.average_hold += _HOLD_SMOOTHING * (held - self.average_hold)
+
+    def stats(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "average_hold_seconds": round(self.average_hold, 3) if self.average_hold is not None else None
+        }
+
+
+class AdmissionController(_Admission):
+    """Admission for threads: ``with admission.slot(): generate_answer(...)``"""
+
+    kind = 'thread'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self, max_wait: Optional[float] = None):
+        """Hold a slot for the block; waits at most ``max_wait`` (capped at the configured wait)"""
+        started = time.perf_counter()
+        with self._condition:
+            if self.active >= self.limit:
+                if self.waiting >= self.max_queue:
+                    self._reject('queue_full')
+                self.waiting += 1
+                LLM_QUEUE_DEPTH.inc(controller=self.kind)
+                try:
+                    admitted = self._condition.wait_for(
+                        lambda: self.active < self.limit, timeout=self._wait_limit(max_wait)
+                    )
+                finally:
+                    self.waiting -= 1
+                    LLM_QUEUE_DEPTH.dec(controller=self.kind)
+                if not admitted:
+                    self._reject('timeout', time.perf_counter() - started)
+            self._admit(time.perf_counter() - started)
+        acquired = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._release(time.perf_counter() - acquired)
+                self._condition.notify()
+
+
+class AsyncAdmissionController(_Admission):
+    """Admission for coroutines on one event loop: ``async with admission.slot(): ...``"""
+
+    kind = 'async'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Created on first use, inside the worker's event loop
+        self._condition = None
+
+    @asynccontextmanager
+    async def slot(self, max_wait: Optional[float] = None):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        started = time.perf_counter()
+        async with self._condition:
+            if self.active >= self.limit:
+                if self.waiting >= self.max_queue:
+                    self._reject('queue_full')
+                self.waiting += 1
+                LLM_QUEUE_DEPTH.inc(controller=self.kind)
+                try:
+                    await asyncio.wait_for(
+                        self._condition.wait_for(lambda: self.active < self.limit),
+                        timeout=self._wait_limit(max_wait)
+                    )
+                    admitted = True
+                except asyncio.TimeoutError:
+                    admitted = False
+                finally:
+                    self.waiting -= 1
+                    LLM_QUEUE_DEPTH.dec(controller=self.kind)
+                if not admitted:
+                    self._reject('timeout', time.perf_counter() - started)
+            self._admit(time.perf_counter() - started)
+        acquired = time.perf_counter()
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._release(time.perf_counter() - acquired)
+                self._condition.notify()
@@ -0,0 +1,163 @@
+# answer_cache.py
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from retrieval import document_version
+
+ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', '512'))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv('ANSWER_CACHE_TTL_SECONDS', '3600'))
+# Cosine similarity above which two questions are treated as the same
+ANSWER_CACHE_SIMILARITY = float(os.getenv('ANSWER_CACHE_SIMILARITY', '0.95'))
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Entry:
+    def __init__(self, key, embedding, result, versions):
+        self.key = key
+        self.embedding = embedding
+        self.result = result
+        # Collection key -> {record id: version} of the references used
+        self.versions = versions
+        self.created = time.time()
+
+
+class AnswerCache:
+    """LRU/TTL cache of answers for exact and near-duplicate questions.
+
+    Entries are found by normalized question text, or failing that by the
+    cosine similarity of the question embedding. Each entry remembers the
+    version (ingestion content hash) of every document it was answered
+    from; on a hit those documents are re-read by id and the entry is
+    dropped if any of them changed or disappeared, so re-ingestion
+    invalidates stale answers. New documents that would now rank higher
+    are only picked up once the entry expires after ``ttl_seconds``.
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+                 similarity=ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def _expired(self, entry: _Entry) -> bool:
+        return time.time() - entry.created > self.ttl_seconds
+
+    def _is_current(self, entry: _Entry, collections: Dict) -> bool:
+        """Check the documents behind an entry still have the versions it saw"""
+        for key, versions in entry.versions.items():
+            collection = collections.get(key)
+            if collection is None:
+                return False
+            current = collection.get(ids=list(versions), include=['documents', 'metadatas'])
+            found = {
+                record_id: document_version(document, metadata)
+                for record_id, document, metadata in zip(
+                    current['ids'], current['documents'], current['metadatas']
+                )
+            }
+            if found != versions:
+                return False
+        return True
+
+    def _take(self, entry: Optional[_Entry], collections: Dict) -> Optional[Dict]:
+        if entry is None:
+            return None
+        if self._expired(entry) or not self._is_current(entry, collections):
+            with self._lock:
+                if self._entries.pop(entry.key, None) is not None:
+                    self.invalidations += 1
+            return None
+        with self._lock:
+            if entry.key in self._entries:
+                self._entries.move_to_end(entry.key)
+        return entry.result
+
+    def get_exact(self, normalized: str, collections: Dict) -> Optional[Dict]:
+        """Cached result for an identical normalized question"""
+        with self._lock:
+            entry = self._entries.get(normalized)
+        result = self._take(entry, collections)
+        if result is not None:
+            self.exact_hits += 1
+        return result
+
+    def get_similar(self, embedding: List[float], collections: Dict) -> Optional[Dict]:
+        """Cached result for the most similar question above the threshold.
+
+        Counts a miss when nothing qualifies, so call it after get_exact.
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+        best = None
+        if entries:
+            scores = np.stack([entry.embedding for entry in entries]) @ _unit(embedding)
+            index = int(np.argmax(scores))
+            if scores[index] >= self.similarity:
+                best = entries[index]
+        result = self._take(best, collections)
+        if result is not None:
+            self.similar_hits += 1
+        else:
+            self.misses += 1
+        return result
+
+    def put(self, normalized: str, embedding: List[float], result: Dict, references: List[Dict]):
+        """Cache an answer with the versions of the references it used.
+
+        Answers without references (nothing relevant was found) are not
+        cached: there is nothing to validate them against, and they should
+        not outlive a re-ingestion that adds the missing documentation.
+        """
+        if not references:
+            return
+        versions = {}
+        for ref in references:
+            versions.setdefault(ref['collection'], {})[ref['record_id']] = ref['version']
+        entry = _Entry(normalized, _unit(embedding), result, versions)
+        with self._lock:
+            self._entries[normalized] = entry
+            self._entries.move_to_end(normalized)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        hits = self.exact_hits + self.similar_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions
+        }
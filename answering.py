@@ -0,0 +1,129 @@
+# answering.py
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+from anthropic import APITimeoutError
+
+from context_packer import estimate_tokens
+from metrics import TOKENS
+
+# Same markers as anthropic.HUMAN_PROMPT / anthropic.AI_PROMPT
+HUMAN_PROMPT = "\n\nHuman:"
+AI_PROMPT = "\n\nAssistant:"
+
+CLAUDE_MODEL = os.getenv('CLAUDE_MODEL', 'claude-2.1')
+MAX_TOKENS = int(os.getenv('CLAUDE_MAX_TOKENS', '1024'))
+
+NO_CONTEXT_ANSWER = (
+    "I couldn't find anything in the support knowledge base about this question. "
+    "Please rephrase it or escalate to the support team."
+)
+# Returned with the references when the request deadline leaves no time for Claude
+DEADLINE_ANSWER = (
+    "I couldn't write an answer in the time available. "
+    "The references below are the closest matches in the support knowledge base."
+)
+
+
+def build_prompt(question: str, references: List[Dict]) -> str:
+    """Build the completion prompt from the question and retrieved references"""
+    context = "\n\n".join(
+        f"[{i}] {ref['title']}{' > ' + ref['section'] if ref.get('section') else ''} ({ref['type']})\n"
+        f"{ref['content'].strip()}"
+        for i, ref in enumerate(references, 1)
+    )
+    return (
+        f"{HUMAN_PROMPT} You are a GFI customer support assistant. Answer the question "
+        f"using only the reference material below. Cite references by their number. "
+        f"If the references do not contain the answer, say so.\n\n"
+        f"<references>\n{context}\n</references>\n\n"
+        f"Question: {question}{AI_PROMPT}"
+    )
+
+
+def count_tokens(prompt: str, completion: str):
+    """Add a Claude call's estimated prompt and completion tokens to the metrics"""
+    TOKENS.inc(estimate_tokens(prompt), direction='in')
+    TOKENS.inc(estimate_tokens(completion), direction='out')
+
+
+def _call_options(client, timeout: Optional[float]):
+    # Under a deadline the call gets what is left of it, without retries
+    # (each retry would get the full timeout again)
+    if timeout is None:
+        return client, {}
+    return client.with_options(max_retries=0), {'timeout': timeout}
+
+
+def generate_answer(client, question: str, references: List[Dict], timeout: Optional[float] = None) -> str:
+    """Ask Claude to answer the question from the references.
+
+    With ``timeout`` (seconds) a slow call raises anthropic.APITimeoutError.
+    """
+    if not references:
+        return NO_CONTEXT_ANSWER
+    prompt = build_prompt(question, references)
+    client, options = _call_options(client, timeout)
+    completion = client.completions.create(
+        model=CLAUDE_MODEL,
+        max_tokens_to_sample=MAX_TOKENS,
+        prompt=prompt,
+        **options
+    )
+    count_tokens(prompt, completion.completion)
+    return completion.completion.strip()
+
+
+async def generate_answer_async(client, question: str, references: List[Dict],
+                                timeout: Optional[float] = None) -> str:
+    """generate_answer for an AsyncAnthropic client"""
+    if not references:
+        return NO_CONTEXT_ANSWER
+    prompt = build_prompt(question, references)
+    client, options = _call_options(client, timeout)
+    completion = await client.completions.create(
+        model=CLAUDE_MODEL,
+        max_tokens_to_sample=MAX_TOKENS,
+        prompt=prompt,
+        **options
+    )
+    count_tokens(prompt, completion.completion)
+    return completion.completion.strip()
+
+
+def stream_answer(client, question: str, references: List[Dict], timeout: Optional[float] = None) -> Iterator[str]:
+    """Yield the answer text from Claude as it is generated.
+
+    With ``timeout`` (seconds for the whole answer) the stream is closed and
+    anthropic.APITimeoutError raised once it runs out, after whatever text
+    arrived in time has been yielded.
+    """
+    if not references:
+        yield NO_CONTEXT_ANSWER
+        return
+    prompt = build_prompt(question, references)
+    expires = time.monotonic() + timeout if timeout is not None else None
+    client, options = _call_options(client, timeout)
+    stream = client.completions.create(
+        model=CLAUDE_MODEL,
+        max_tokens_to_sample=MAX_TOKENS,
+        prompt=prompt,
+        stream=True,
+        **options
+    )
+    chunks = []
+    try:
+        for completion in stream:
+            if completion.completion:
+                chunks.append(completion.completion)
+                yield completion.completion
+            if expires is not None and time.monotonic() > expires:
+                raise APITimeoutError(request=stream.response.request)
+    except httpx.TimeoutException as e:
+        # Read timeouts surface from the iteration, outside the client's own handling
+        raise APITimeoutError(request=e.request) from e
+    finally:
+        stream.response.close()
+        count_tokens(prompt, ''.join(chunks))
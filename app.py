@@ -1,79 +1,91 @@
+import time
+_import_started = time.perf_counter()
+
 import os
+import json
 import logging
 import sys
+import threading
 import traceback
-from flask import Flask, request, jsonify
-import chromadb
-from chromadb.config import Settings
-from anthropic import Anthropic
+from flask import Flask, Response, request, jsonify, stream_with_context
 from dotenv import load_dotenv
-from typing import List, Dict
-
-# Enhanced Logging Configuration
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('app_logs.log', mode='w')
-    ]
-)
+from typing import Dict
+from admission import Overloaded
+from deadline import Deadline, DeadlineExceeded
+from metrics import CONTENT_TYPE, REGISTRY, REQUESTS, observe_timings, server_timing
+from request_timings import RequestTimings
+from startup_profile import StartupProfile
+from structured_logging import logging_stats, setup_logging
+
+# chromadb, anthropic and the SupportSystem are imported by load_support_system(),
+# off the import path, so / and /health answer while they load
+
+# Logging: request threads only enqueue; a background thread writes JSON
+# lines to stdout and a rotating app_logs.log (see structured_logging.py)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Log system information
 logger.info(f"Python Version: {sys.version}")
 logger.info(f"Platform: {sys.platform}")
 
+startup = StartupProfile()
+
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
 
-class SupportSystem:
-    def __init__(self):
-        logger.info("Initializing SupportSystem...")
-        try:
-            # Log all environment variables for debugging
-            logger.info("Environment Variables:")
-            for key, value in os.environ.items():
-                logger.debug(f"ENV: {key} = {'*****' if 'KEY' in key else value}")
-
-            # Initialize ChromaDB
-            db_directory = "/app/data/chroma_db"
-            os.makedirs(db_directory, exist_ok=True)
-            self.db = chromadb.Client(Settings(
-                chroma_db_impl="duckdb+parquet",
-                persist_directory=db_directory
-            ))
-
-            self.collections = {
-                key: self.db.get_or_create_collection(name)
-                for key, name in {
-                    'articles': 'support_articles',
-                    'tickets': 'support_tickets',
-                    'internal': 'support_internal',
-                    'drafts': 'support_drafts'
-                }.items()
-            }
-
-            # Initialize Claude (Anthropic API)
-            self.client = Anthropic(os.getenv('ANTHROPIC_API_KEY'))
-
-            logger.info("SupportSystem initialized successfully.")
-        except Exception as e:
-            logger.critical(f"Initialization error: {e}")
-            logger.critical(traceback.format_exc())
-            raise
+# Batch endpoint limits
+MAX_BATCH_QUESTIONS = int(os.getenv('MAX_BATCH_QUESTIONS', '1000'))
 
-    # [Rest of the methods remain the same as in your previous implementation]
+# Set by gunicorn.conf.py when the master imports the app before forking workers
+PRELOAD_APP = os.getenv('PRELOAD_APP') == '1'
+
+startup.record('import_web', time.perf_counter() - _import_started)
 
 # Initialize support system
 support_system = None
-try:
-    support_system = SupportSystem()
-except Exception as e:
-    logger.critical(f"SupportSystem initialization failed: {e}")
+startup_error = None
+
+def load_support_system():
+    """Import the heavy modules and build the SupportSystem, timing each phase.
+
+    Runs in the gunicorn master when preloading (workers warm up after
+    fork), otherwise on a background thread that also runs the warm-up.
+    """
+    global support_system, startup_error
+    try:
+        with startup.phase('import_chromadb'):
+            import chromadb  # noqa: F401
+        with startup.phase('import_anthropic'):
+            import anthropic  # noqa: F401
+        with startup.phase('import_support'):
+            from support import SupportSystem
+        system = SupportSystem(profile=startup)
+        if PRELOAD_APP:
+            system.preload()
+    except Exception as e:
+        startup_error = str(e)
+        logger.critical(f"SupportSystem initialization failed: {e}")
+        logger.critical(traceback.format_exc())
+        return
+    support_system = system
+    logger.info(startup.summary())
+    if not PRELOAD_APP:
+        system.warm_up()
+
+if PRELOAD_APP:
+    load_support_system()
+else:
+    threading.Thread(target=load_support_system, name='startup', daemon=True).start()
+
+def unavailable():
+    """Response for answer endpoints while the support system is loading or failed."""
+    if startup_error:
+        return jsonify({"error": f"Support system failed to start: {startup_error}"}), 500
+    return jsonify({"error": "Support system is starting up"}), 503
 
 @app.route('/')
 def home():
@@ -82,47 +94,229 @@ def home():
     <p>API Endpoints:</p>
     <ul>
         <li>/health - Health check</li>
+        <li>/ready - Readiness check (200 once warmed up)</li>
         <li>/answer - Get answer (POST)</li>
+        <li>/answer/stream - Stream answer as server-sent events (POST, or GET ?question=)</li>
+        <li>/answer/batch - Get answers for many questions (POST)</li>
+        <li>/metrics - Prometheus metrics</li>
     </ul>
     """
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
+    if support_system is not None:
+        status = "healthy"
+    else:
+        status = "failed" if startup_error else "starting"
     return jsonify({
-        "status": "healthy" if support_system else "failed",
+        "status": status,
+        "ready": support_system.ready if support_system else False,
+        "startup": startup.as_dict(),
+        "startup_error": startup_error,
+        "answer_cache": support_system.answer_cache.stats() if support_system else None,
+        "admission": support_system.admission.stats() if support_system else None,
+        "logging": logging_stats(),
         "environment": {
             "python_version": sys.version,
             "platform": sys.platform
         }
     })
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness check: 503 until this worker has run its warm-up query."""
+    if support_system is None:
+        status = "failed" if startup_error else "starting"
+        return jsonify({"status": status, "error": startup_error}), 503
+    if not support_system.ready:
+        status = "failed" if support_system.warmup_error else "warming_up"
+        return jsonify({"status": status, "error": support_system.warmup_error}), 503
+    return jsonify({"status": "ready", "warmup_seconds": support_system.warmup_seconds})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for this worker."""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.after_request
+def count_answer_requests(response):
+    if request.url_rule is not None and request.url_rule.rule.startswith('/answer'):
+        REQUESTS.inc(endpoint=request.url_rule.rule, status=response.status_code)
+    return response
+
+def overloaded(error: Overloaded):
+    """429 for a request shed by admission control."""
+    logger.warning(f"Rejected request: {error}")
+    response = jsonify({"error": str(error), "retry_after": error.retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def log_answer(question: str, timings: Dict, references: int):
+    """One log line per answered question, with its stage timings as fields"""
+    stages = " ".join(f"{stage}={milliseconds:.1f}ms" for stage, milliseconds in timings.items())
+    logger.info(
+        f"Answered question ({len(question)} chars, {references} references): {stages}",
+        extra={"event": "answer", "timings_ms": timings, "references": references, "question_chars": len(question)}
+    )
+
+def format_sse(event: str, data: Dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/answer/stream', methods=['GET', 'POST'])
+def stream_answer_events():
+    """Stream references, then answer tokens, as server-sent events."""
+    if support_system is None:
+        return unavailable()
+
+    data = request.get_json(silent=True) or {}
+    question = data.get('question') or request.args.get('question', '')
+    if not question:
+        return jsonify({"error": "No question provided"}), 400
+    seconds = data.get('deadline_seconds')
+    if seconds is None and 'deadline_seconds' in request.args:
+        # GET streams pass it in the query string; a non-number is rejected below
+        seconds = request.args.get('deadline_seconds', type=float, default=request.args['deadline_seconds'])
+    try:
+        deadline = Deadline.from_request(seconds)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Once the stream has started it can only report overload as an event
+    if support_system.admission.full():
+        return overloaded(Overloaded('queue_full', support_system.admission.retry_after()))
+
+    def events():
+        try:
+            for event, payload in support_system.stream_answer(question, deadline=deadline):
+                if event == 'references':
+                    yield format_sse('references', {"question": question, "references": payload})
+                elif event == 'token':
+                    yield format_sse('token', {"text": payload})
+                else:
+                    yield format_sse('done', {
+                        "status": "success",
+                        "response": payload['answer'],
+                        "context": payload.get('context'),
+                        "timings": payload.get('timings'),
+                        "partial": payload.get('partial')
+                    })
+                    observe_timings(payload['timings'])
+                    log_answer(question, payload['timings'], len(payload['references']))
+        except Overloaded as e:
+            logger.warning(f"Rejected stream: {e}")
+            yield format_sse('error', {"error": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            logger.error(traceback.format_exc())
+            yield format_sse('error', {"error": str(e)})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Stop proxies from buffering the stream
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @app.route('/answer', methods=['POST'])
 def get_answer():
     """Endpoint to get an answer for a question."""
+    if request.args.get('stream') in ('1', 'true'):
+        return stream_answer_events()
     try:
         if support_system is None:
-            return jsonify({"error": "Support system not initialized"}), 500
+            return unavailable()
 
         data = request.json
         question = data.get('question', '')
         if not question:
             return jsonify({"error": "No question provided"}), 400
+        try:
+            deadline = Deadline.from_request(data.get('deadline_seconds'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        result = support_system.answer_question(question)
-        return jsonify({
-            "status": "success",
-            "data": {
-                "question": question,
-                "response": result['answer'],
-                "references": result['references']
-            }
-        })
+        timings = RequestTimings()
+        result = support_system.answer_question(question, timings, deadline)
+        with timings.stage('serialize'):
+            response = jsonify({
+                "status": "success",
+                "data": {
+                    "question": question,
+                    "response": result['answer'],
+                    "references": result['references'],
+                    "context": result.get('context'),
+                    "timings": result.get('timings'),
+                    "partial": result.get('partial')
+                }
+            })
+        # Unlike the body, the header and metrics include serialization
+        final = timings.as_dict()
+        response.headers['Server-Timing'] = server_timing(final)
+        observe_timings(final)
+        log_answer(question, final, len(result['references']))
+        return response
+    except Overloaded as e:
+        return overloaded(e)
+    except DeadlineExceeded as e:
+        logger.warning(f"Deadline exceeded: {e}")
+        return jsonify({"error": f"Deadline exceeded: {e}"}), 504
     except Exception as e:
         logger.error(f"Error processing request: {e}")
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
+@app.route('/answer/batch', methods=['POST'])
+def get_answers_batch():
+    """Endpoint to answer many questions in one request."""
+    try:
+        if support_system is None:
+            return unavailable()
+
+        data = request.get_json(silent=True) or {}
+        questions = data.get('questions')
+        if not isinstance(questions, list) or not questions:
+            return jsonify({"error": "No questions provided"}), 400
+        if len(questions) > MAX_BATCH_QUESTIONS:
+            return jsonify({"error": f"At most {MAX_BATCH_QUESTIONS} questions per batch"}), 400
+        try:
+            deadline = Deadline.from_request(data.get('deadline_seconds'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        valid = [q for q in questions if isinstance(q, str) and q.strip()]
+        outcomes = iter(support_system.answer_questions(valid, deadline=deadline)) if valid else iter([])
+
+        results = []
+        for question in questions:
+            if not (isinstance(question, str) and question.strip()):
+                results.append({"error": "No question provided"})
+                continue
+            outcome = next(outcomes)
+            if 'error' in outcome:
+                results.append({"error": outcome['error']})
+                continue
+            results.append({
+                "status": "success",
+                "data": {
+                    "question": question,
+                    "response": outcome['result']['answer'],
+                    "references": outcome['result']['references'],
+                    "context": outcome['result'].get('context'),
+                    "partial": outcome['result'].get('partial')
+                }
+            })
+
+        return jsonify({"status": "success", "results": results})
+    except Exception as e:
+        logger.error(f"Error processing batch request: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
 def get_port():
     """Dynamically get port from Railway or use a fallback"""
     try:
@@ -144,18 +338,10 @@ def get_port():
         return 5001
 
 if __name__ == '__main__':
-    # Explicitly log all environment variables for debugging
-    logger.info("Startup Environment Variables:")
-    for key, value in os.environ.items():
-        logger.debug(f"ENV: {key} = {'*****' if 'KEY' in key else value}")
-    
     port = get_port()
     host = '0.0.0.0'
     
     logger.info(f"Starting application on {host}:{port}")
     
-    # Ensure logging is flushed
-    logging.getLogger().handlers[0].flush()
-    
     # Run the application
     app.run(host=host, port=port)
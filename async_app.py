@@ -0,0 +1,293 @@
+# async_app.py
+"""Asyncio serving mode for the support assistant.
+
+Serves the same endpoints as app.py (/, /health, /answer) on an event
+loop: Claude is called through the async Anthropic client and ChromaDB
+queries and embedding run on thread pools, so one process can hold
+hundreds of questions in flight instead of one per sync worker.
+
+Run with:
+    uvicorn async_app:app --host 0.0.0.0 --port $PORT
+or under gunicorn:
+    gunicorn -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT async_app:app
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from anthropic import APITimeoutError, AsyncAnthropic
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, JSONResponse, Response
+from starlette.routing import Route
+
+from admission import AsyncAdmissionController, Overloaded
+from answer_cache import normalize_question
+from answering import DEADLINE_ANSWER, NO_CONTEXT_ANSWER, generate_answer_async
+from context_packer import pack_context
+from deadline import MIN_GENERATE_SECONDS, Deadline, DeadlineExceeded
+from metrics import (
+    COALESCED,
+    CONTENT_TYPE,
+    DEADLINE_EXCEEDED,
+    REGISTRY,
+    REQUESTS,
+    observe_references,
+    observe_timings,
+    server_timing,
+)
+from request_timings import RequestTimings
+from retrieval import fan_out_query_async, public_reference
+from structured_logging import logging_stats
+
+# Last: importing app starts loading the SupportSystem on a background thread,
+# which must not race the imports above for half-initialized modules (numpy)
+import app as sync_app  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Embedding and cache validation are CPU/SQLite bound, keep them off the loop
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('ASYNC_EMBED_THREADS', str(os.cpu_count() or 4))),
+    thread_name_prefix='embed'
+)
+
+# Created on first use, inside the worker's event loop
+_async_client = None
+
+# Bounds concurrent Claude calls on this event loop (admission.py)
+_admission = AsyncAdmissionController()
+
+
+def get_async_client() -> AsyncAnthropic:
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncAnthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+    return _async_client
+
+
+async def answer_question_async(question: str, timings: Optional[RequestTimings] = None,
+                                deadline: Optional[Deadline] = None) -> Dict:
+    """Async equivalent of SupportSystem.answer_question, sharing its caches"""
+    support_system = sync_app.support_system
+    timings = timings or RequestTimings()
+    if support_system.in_flight is None:
+        return {**await _answer_async(question, timings, deadline), 'timings': timings.as_dict()}
+
+    started = time.perf_counter()
+    try:
+        result, shared = await support_system.in_flight.do_async(
+            normalize_question(question), lambda: _answer_async(question, timings, deadline),
+            timeout=deadline.remaining() if deadline else None
+        )
+    except TimeoutError as e:
+        DEADLINE_EXCEEDED.inc(stage='coalesced')
+        raise DeadlineExceeded(str(e)) from e
+    if shared:
+        timings.record('coalesced', time.perf_counter() - started)
+        if 'partial' in result:
+            # Cut short by the other caller's deadline, which may be tighter than ours
+            result = await _answer_async(question, timings, deadline)
+        else:
+            COALESCED.inc()
+            logger.info("Shared the answer of an identical question in flight")
+    return {**result, 'timings': timings.as_dict()}
+
+
+async def _answer_async(question: str, timings: RequestTimings, deadline: Optional[Deadline] = None) -> Dict:
+    support_system = sync_app.support_system
+    loop = asyncio.get_running_loop()
+    cached, normalized, query_embedding = await loop.run_in_executor(
+        _executor, support_system._cached_answer, question, timings
+    )
+    if cached is not None:
+        return cached
+
+    timed_out = []
+    with timings.stage('retrieve'):
+        retrieved = await fan_out_query_async(
+            support_system.collections, query_embedding,
+            question=question, lexical_index=support_system.lexical_index, timings=timings,
+            timeout=deadline.retrieval_timeout() if deadline else None, timed_out=timed_out
+        )
+    with timings.stage('pack'):
+        references, context = pack_context(retrieved)
+    observe_references(retrieved, references)
+    logger.info(f"Packed {len(references)} references into {context['tokens']}/{context['budget']} context tokens")
+
+    try:
+        answer, answered = await _generate_async(question, references, timings, deadline), True
+    except DeadlineExceeded as e:
+        logger.warning(f"Returning references only: {e}")
+        answer, answered = DEADLINE_ANSWER, False
+    result = {
+        'answer': answer,
+        'references': [public_reference(ref) for ref in references],
+        'context': context
+    }
+    if timed_out or not answered:
+        result['partial'] = {'collections_timed_out': timed_out, 'answer_timed_out': not answered}
+    else:
+        support_system.answer_cache.put(normalized, query_embedding, result, references)
+    return result
+
+
+async def _generate_async(question: str, references: List[Dict], timings: RequestTimings,
+                          deadline: Optional[Deadline] = None) -> str:
+    """Async SupportSystem._generate, with this event loop's admission control"""
+    if not references:
+        return NO_CONTEXT_ANSWER
+    max_wait = None
+    if deadline is not None:
+        try:
+            max_wait = deadline.generation_timeout() - MIN_GENERATE_SECONDS
+        except DeadlineExceeded:
+            DEADLINE_EXCEEDED.inc(stage='generate')
+            raise
+    queued = time.perf_counter()
+    try:
+        async with _admission.slot(max_wait):
+            timings.record('queue', time.perf_counter() - queued)
+            with timings.stage('generate'):
+                return await generate_answer_async(
+                    get_async_client(), question, references,
+                    timeout=deadline.remaining() if deadline else None
+                )
+    except Overloaded as e:
+        if e.reason == 'timeout' and max_wait is not None and max_wait < _admission.max_wait:
+            DEADLINE_EXCEEDED.inc(stage='queue')
+            raise DeadlineExceeded(f"No Claude slot within the {deadline.seconds:g}s deadline") from e
+        raise
+    except APITimeoutError as e:
+        if deadline is None:
+            raise
+        DEADLINE_EXCEEDED.inc(stage='generate')
+        raise DeadlineExceeded(f"Claude did not answer within the {deadline.seconds:g}s deadline") from e
+
+
+async def home(request):
+    return HTMLResponse("""
+    <h1>GFI Support Assistant</h1>
+    <p>API Endpoints:</p>
+    <ul>
+        <li>/health - Health check</li>
+        <li>/ready - Readiness check (200 once warmed up)</li>
+        <li>/answer - Get answer (POST)</li>
+        <li>/metrics - Prometheus metrics</li>
+    </ul>
+    """)
+
+
+async def health_check(request):
+    """Health check endpoint."""
+    support_system = sync_app.support_system
+    if support_system is not None:
+        status = "healthy"
+    else:
+        status = "failed" if sync_app.startup_error else "starting"
+    return JSONResponse({
+        "status": status,
+        "mode": "async",
+        "ready": support_system.ready if support_system else False,
+        "startup": sync_app.startup.as_dict(),
+        "answer_cache": support_system.answer_cache.stats() if support_system else None,
+        "admission": _admission.stats(),
+        "logging": logging_stats(),
+        "environment": {
+            "python_version": sys.version,
+            "platform": sys.platform
+        }
+    })
+
+
+async def readiness_check(request):
+    """Readiness check: 503 until this worker has run its warm-up query."""
+    support_system = sync_app.support_system
+    if support_system is None:
+        status = "failed" if sync_app.startup_error else "starting"
+        return JSONResponse({"status": status, "error": sync_app.startup_error}, status_code=503)
+    if not support_system.ready:
+        status = "failed" if support_system.warmup_error else "warming_up"
+        return JSONResponse({"status": status, "error": support_system.warmup_error}, status_code=503)
+    return JSONResponse({"status": "ready", "warmup_seconds": support_system.warmup_seconds})
+
+
+async def metrics(request):
+    """Prometheus metrics for this worker."""
+    return Response(REGISTRY.render(), headers={"Content-Type": CONTENT_TYPE})
+
+
+async def get_answer(request):
+    """Endpoint to get an answer for a question."""
+    response = await answer_response(request)
+    REQUESTS.inc(endpoint='/answer', status=response.status_code)
+    return response
+
+
+async def answer_response(request):
+    try:
+        if sync_app.support_system is None:
+            if sync_app.startup_error:
+                return JSONResponse(
+                    {"error": f"Support system failed to start: {sync_app.startup_error}"}, status_code=500
+                )
+            return JSONResponse({"error": "Support system is starting up"}, status_code=503)
+
+        try:
+            data = await request.json()
+        except ValueError:
+            data = {}
+        question = (data or {}).get('question', '')
+        if not question:
+            return JSONResponse({"error": "No question provided"}, status_code=400)
+        try:
+            deadline = Deadline.from_request(data.get('deadline_seconds'))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        timings = RequestTimings()
+        result = await answer_question_async(question, timings, deadline)
+        with timings.stage('serialize'):
+            response = JSONResponse({
+                "status": "success",
+                "data": {
+                    "question": question,
+                    "response": result['answer'],
+                    "references": result['references'],
+                    "context": result.get('context'),
+                    "timings": result.get('timings'),
+                    "partial": result.get('partial')
+                }
+            })
+        final = timings.as_dict()
+        response.headers['Server-Timing'] = server_timing(final)
+        observe_timings(final)
+        sync_app.log_answer(question, final, len(result['references']))
+        return response
+    except Overloaded as e:
+        logger.warning(f"Rejected request: {e}")
+        return JSONResponse(
+            {"error": str(e), "retry_after": e.retry_after},
+            status_code=429,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except DeadlineExceeded as e:
+        logger.warning(f"Deadline exceeded: {e}")
+        return JSONResponse({"error": f"Deadline exceeded: {e}"}, status_code=504)
+    except Exception as e:
+        logger.error(f"Error processing request: {e}")
+        logger.error(traceback.format_exc())
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+app = Starlette(routes=[
+    Route('/', home),
+    Route('/health', health_check, methods=['GET']),
+    Route('/ready', readiness_check, methods=['GET']),
+    Route('/answer', get_answer, methods=['POST']),
+    Route('/metrics', metrics, methods=['GET']),
+])
@@ -0,0 +1,192 @@
+# ingest_benchmark.py
+"""Measure ingestion throughput on synthetic corpora of increasing size.
+
+For each size a corpus is generated (synthetic_corpus.py, reused when it
+already exists under --work-dir) and ingested into an empty Chroma
+directory by ingest.py in a child process, so every run has its own peak
+RSS. Reports end-to-end docs/sec, peak RSS and seconds per stage (parse,
+convert = HTML cleanup, embed, write), and saves everything as JSON.
+
+Usage:
+    python benchmarks/ingest_benchmark.py --sizes 1000 10000 100000
+    python benchmarks/ingest_benchmark.py --sizes 1000 --baseline benchmarks/results/previous.json
+
+With --baseline, exits 1 when docs/sec at any size dropped by more than
+--tolerance against that earlier result file.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from synthetic_corpus import generate_corpus
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+from embedding_cache import cache_path_for  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_WORK_DIR = os.path.join(BENCHMARK_DIR, "work")
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+
+def _children_peak_rss_mb() -> float:
+    value = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return value / (1024 * 1024) if sys.platform == 'darwin' else value / 1024
+
+
+def ensure_corpus(work_dir: str, size: int, seed: int) -> Dict:
+    """Generate the corpus for ``size`` unless an identical one is on disk"""
+    data_dir = os.path.join(work_dir, f"corpus_{size}")
+    info_path = os.path.join(data_dir, "corpus.json")
+    if os.path.exists(info_path):
+        with open(info_path) as f:
+            corpus = json.load(f)
+        if corpus.get("seed") == seed:
+            return {**corpus, "data_dir": data_dir, "reused": True}
+    shutil.rmtree(data_dir, ignore_errors=True)
+    corpus = generate_corpus(data_dir, size, seed)
+    with open(info_path, "w") as f:
+        json.dump(corpus, f, indent=2)
+    return {**corpus, "data_dir": data_dir, "reused": False}
+
+
+def ingest_run(data_dir: str, extra_args: List[str], warm_cache: bool = False) -> Dict:
+    """Run ingest.py on a corpus into a fresh Chroma directory; returns its summary.
+
+    The embedding cache is emptied first unless ``warm_cache``, so the embed
+    stage measures the model rather than cache hits.
+    """
+    chroma_path = os.path.join(data_dir, "chroma_db")
+    shutil.rmtree(chroma_path, ignore_errors=True)
+    shutil.rmtree(os.path.join(data_dir, "lexical_index"), ignore_errors=True)
+    if not warm_cache:
+        for path in glob.glob(cache_path_for(chroma_path) + "*"):
+            os.remove(path)
+    summary_path = os.path.join(data_dir, "ingest_summary.json")
+    if os.path.exists(summary_path):
+        os.remove(summary_path)
+
+    command = [sys.executable, os.path.join(PROJECT_DIR, "ingest.py"),
+               "--chroma-path", chroma_path, "--summary", summary_path] + extra_args
+    env = {**os.environ, "DATA_DIR": data_dir}
+    start_time = time.time()
+    with open(os.path.join(data_dir, "ingest.log"), "w") as log_file:
+        returncode = subprocess.call(command, cwd=PROJECT_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    seconds = time.time() - start_time
+    if returncode != 0 or not os.path.exists(summary_path):
+        raise RuntimeError(f"ingest.py failed (exit {returncode}); see {os.path.join(data_dir, 'ingest.log')}")
+    with open(summary_path) as f:
+        summary = json.load(f)
+    summary["wall_seconds"] = round(seconds, 3)
+    return summary
+
+
+def run_size(size: int, work_dir: str, seed: int, extra_args: List[str], warm_cache: bool = False) -> Dict:
+    corpus = ensure_corpus(work_dir, size, seed)
+    origin = "reused" if corpus["reused"] else f"generated in {corpus['seconds']:.1f}s"
+    print(f"\n{size} documents: corpus {corpus['mb']:.1f} MB ({origin})")
+    summary = ingest_run(corpus["data_dir"], extra_args, warm_cache)
+
+    seconds = summary["seconds"]
+    records = sum(result.get("upserted", 0) for result in summary["sources"].values())
+    result = {
+        "documents": size,
+        "corpus_mb": corpus["mb"],
+        "records": records,
+        "seconds": seconds,
+        "wall_seconds": summary["wall_seconds"],
+        "docs_per_sec": round(size / seconds, 2) if seconds else 0.0,
+        "records_per_sec": round(records / seconds, 2) if seconds else 0.0,
+        "peak_rss_mb": summary["peak_rss_mb"],
+        "stages": summary["stages"],
+        "sources": {
+            name: {key: source.get(key) for key in ("upserted", "count", "seconds")}
+            for name, source in summary["sources"].items()
+        },
+        "lexical_index_seconds": (summary.get("lexical_index") or {}).get("seconds")
+    }
+    print(f"  {result['docs_per_sec']:.1f} docs/sec ({records} records in {seconds:.1f}s), "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    for stage, values in result["stages"].items():
+        print(f"  {stage:<8} {values['seconds']:8.2f}s  {values['docs_per_sec']:10.1f} docs/sec")
+    return result
+
+
+def compare(results: List[Dict], baseline_path: str, tolerance: float) -> List[str]:
+    """Sizes whose docs/sec fell more than ``tolerance`` below the baseline"""
+    with open(baseline_path) as f:
+        baseline = {run["documents"]: run for run in json.load(f)["runs"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["documents"])
+        if previous is None or not previous["docs_per_sec"]:
+            continue
+        change = result["docs_per_sec"] / previous["docs_per_sec"] - 1
+        print(f"{result['documents']} documents: {result['docs_per_sec']:.1f} docs/sec "
+              f"vs {previous['docs_per_sec']:.1f} ({change:+.1%})")
+        if change < -tolerance:
+            regressions.append(f"{result['documents']} documents: {change:+.1%}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingest.py on synthetic Zendesk corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Corpus sizes in documents")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="Where corpora and Chroma directories go")
+    parser.add_argument("--out", help="Result JSON (default: benchmarks/results/ingest-<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier result JSON to compare docs/sec against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed docs/sec drop against the baseline")
+    parser.add_argument("--workers", type=int, help="Passed to ingest.py --workers")
+    parser.add_argument(
+        "--warm-cache",
+        action="store_true",
+        help="Keep the embedding cache from the previous run (measures re-ingestion)"
+    )
+    args = parser.parse_args(argv)
+
+    extra_args = []
+    if args.workers is not None:
+        extra_args += ["--workers", str(args.workers)]
+
+    runs = [run_size(size, args.work_dir, args.seed, extra_args, args.warm_cache) for size in args.sizes]
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "host": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "ingest_args": extra_args,
+        "warm_cache": args.warm_cache,
+        "seed": args.seed,
+        "children_peak_rss_mb": round(_children_peak_rss_mb(), 1),
+        "runs": runs
+    }
+
+    out = args.out or os.path.join(DEFAULT_RESULTS_DIR, f"ingest-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {out}")
+
+    if args.baseline:
+        regressions = compare(runs, args.baseline, args.tolerance)
+        if regressions:
+            print(f"Throughput regressions: {'; '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# load_test.py
+"""Replay a question log against /answer and report latency by stage.
+
+Sends the questions (cycling through the log) from N concurrent clients
+and reports throughput plus p50/p95/p99 of the end-to-end latency and of
+each server stage (cache, embed, retrieve, pack, generate) taken from the
+``timings`` field of /answer responses. Run it against each worker model
+or retrieval setting, with the Anthropic API replaced by the local stub:
+
+    python benchmarks/stub_anthropic.py --latency 0.8 &
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8089 ANTHROPIC_API_KEY=stub ANSWER_CACHE_SIZE=0 \\
+        gunicorn app:app &
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --concurrency 1 8 32 \\
+        --requests 200 --unique-questions --label sync-chroma --out results/sync-chroma.json
+
+ANSWER_CACHE_SIZE=0 measures the uncached path; leave the cache on to
+measure a realistic mix of repeats. Concurrent identical questions are
+still merged by single-flight (COALESCE_QUESTIONS), so for uncached
+numbers also pass --unique-questions, which tags every request's question
+with its request number. Each run reports how many answers were coalesced:
+from the ``coalesced`` timing of the responses, and the change in
+support_answer_coalesced_total scraped from /metrics (one worker's counter
+under gunicorn). The question log is a text file with one question per
+line, or JSON lines with a "question" field.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+DEFAULT_QUESTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "questions.txt")
+STAGES = ["coalesced", "cache", "embed", "retrieve", "pack", "generate", "total"]
+PERCENTILES = [50, 95, 99]
+
+
+def load_questions(path: str) -> List[str]:
+    questions = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                question = json.loads(line).get('question')
+                if question:
+                    questions.append(question)
+            else:
+                questions.append(line)
+    if not questions:
+        raise ValueError(f"No questions in {path}")
+    return questions
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Linear-interpolated percentile of values (0 for none)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def coalesced_total(metrics_url: str, timeout: float = 10.0) -> Optional[float]:
+    """support_answer_coalesced_total from /metrics (None if unavailable)"""
+    try:
+        with urllib.request.urlopen(metrics_url, timeout=timeout) as response:
+            text = response.read().decode('utf-8')
+    except Exception:
+        return None
+    for line in text.splitlines():
+        if line.startswith("support_answer_coalesced_total"):
+            return float(line.split()[-1])
+    # Counters without samples render no line until first incremented
+    return 0.0
+
+
+def ask(url: str, question: str, timeout: float) -> Dict:
+    """POST one question; returns status, client latency (ms) and server timings"""
+    body = json.dumps({"question": question}).encode('utf-8')
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            payload = json.loads(response.read() or b"{}")
+            status = response.status
+    except urllib.error.HTTPError as e:
+        payload, status = {}, e.code
+    except Exception as e:
+        payload, status = {"error": str(e)}, 0
+    latency = (time.perf_counter() - start) * 1000
+    return {
+        "status": status,
+        "latency_ms": latency,
+        "timings": (payload.get("data") or {}).get("timings") or {}
+    }
+
+
+def run(url: str, questions: List[str], concurrency: int, requests: int, warmup: int = 0,
+        timeout: float = 120.0, unique: bool = False, metrics_url: Optional[str] = None) -> Dict:
+    """Send ``requests`` questions from ``concurrency`` clients and summarize
+
+    With ``unique`` every question is tagged with its request number so that
+    no two requests can be coalesced or served from the cache.
+    """
+    source = itertools.cycle(questions)
+    counter = itertools.count(1)
+    lock = threading.Lock()
+
+    def next_question():
+        with lock:
+            question, n = next(source), next(counter)
+        return f"{question} [{n}]" if unique else question
+
+    if warmup:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda _: ask(url, next_question(), timeout), range(warmup)))
+
+    before = coalesced_total(metrics_url) if metrics_url else None
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: ask(url, next_question(), timeout), range(requests)))
+    elapsed = time.perf_counter() - start
+    after = coalesced_total(metrics_url) if metrics_url else None
+
+    ok = [r for r in results if r["status"] == 200]
+    errors = {}
+    for r in results:
+        if r["status"] != 200:
+            errors[str(r["status"])] = errors.get(str(r["status"]), 0) + 1
+
+    latency = {"client": {f"p{p}": round(percentile([r["latency_ms"] for r in ok], p), 2) for p in PERCENTILES}}
+    # Known stages in pipeline order, then any others (retrieve_<collection>, ...)
+    seen = {stage for r in ok for stage in r["timings"]}
+    for stage in [s for s in STAGES if s in seen] + sorted(seen - set(STAGES)):
+        values = [r["timings"][stage] for r in ok if stage in r["timings"]]
+        if values:
+            latency[stage] = {f"p{p}": round(percentile(values, p), 2) for p in PERCENTILES}
+            latency[stage]["count"] = len(values)
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "succeeded": len(ok),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "unique_questions": unique,
+        # Followers of a single-flight leader carry a "coalesced" timing
+        "coalesced": sum(1 for r in ok if "coalesced" in r["timings"]),
+        "coalesced_total": after - before if before is not None and after is not None else None,
+        "latency_ms": latency
+    }
+
+
+def print_report(report: Dict):
+    print(f"\nconcurrency {report['concurrency']}: {report['succeeded']}/{report['requests']} ok "
+          f"in {report['seconds']:.2f}s, {report['throughput_rps']:.2f} req/s"
+          + (f", errors {report['errors']}" if report['errors'] else ""))
+    scraped = report["coalesced_total"]
+    print(f"  coalesced {report['coalesced']} responses"
+          + (f", support_answer_coalesced_total +{scraped:g}" if scraped is not None else "")
+          + (" (unique questions)" if report["unique_questions"] else ""))
+    print(f"  {'stage':<10}" + "".join(f"{f'p{p} ms':>12}" for p in PERCENTILES))
+    for stage, values in report["latency_ms"].items():
+        print(f"  {stage:<10}" + "".join(f"{values[f'p{p}']:>12.1f}" for p in PERCENTILES))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a question log against /answer")
+    parser.add_argument("--url", default="http://127.0.0.1:5001", help="Service base URL")
+    parser.add_argument("--endpoint", default="/answer")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="Question log (text or JSON lines)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8], help="Concurrent clients; several values run a sweep")
+    parser.add_argument("--requests", type=int, help="Requests per run (default: one pass over the log)")
+    parser.add_argument("--warmup", type=int, default=0, help="Unmeasured requests before each run")
+    parser.add_argument("--unique-questions", action="store_true",
+                        help="Tag each request's question so none are coalesced or cached")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout, seconds")
+    parser.add_argument("--label", default="", help="Name for this configuration in the JSON output")
+    parser.add_argument("--out", help="Write the reports as JSON to this file")
+    args = parser.parse_args(argv)
+
+    questions = load_questions(args.questions)
+    url = args.url.rstrip("/") + args.endpoint
+    metrics_url = args.url.rstrip("/") + "/metrics"
+    reports = []
+    for concurrency in args.concurrency:
+        report = run(url, questions, concurrency, args.requests or len(questions), args.warmup, args.timeout,
+                     args.unique_questions, metrics_url)
+        print_report(report)
+        reports.append(report)
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump({"label": args.label, "url": url, "runs": reports}, f, indent=2)
+        print(f"\nWrote {args.out}")
+    return 0 if all(report["succeeded"] for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# stub_anthropic.py
+"""Local stand-in for the Anthropic completions API, for benchmarking.
+
+Answers POST /v1/complete (plain and streamed) after a configurable delay,
+so load tests measure our service rather than Claude or the network. Point
+the service at it with ANTHROPIC_BASE_URL:
+
+    python benchmarks/stub_anthropic.py --port 8089 --latency 0.8 --jitter 0.2
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8089 ANTHROPIC_API_KEY=stub gunicorn app:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = (
+    "Based on the references [1], open the Customer Portal, go to Manage > Licenses and "
+    "select Renew next to the license. The renewal is applied as soon as payment completes."
+)
+STREAM_CHUNKS = 20
+
+
+class StubState:
+    def __init__(self, latency: float, jitter: float):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        return max(0.0, random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+
+    def count(self, prompt: str):
+        with self._lock:
+            self.requests += 1
+            self.prompt_chars += len(prompt)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: StubState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, {"requests": self.state.requests, "prompt_chars": self.state.prompt_chars})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/complete":
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        self.state.count(body.get("prompt", ""))
+        model = body.get("model", "stub")
+        delay = self.state.delay()
+
+        if not body.get("stream"):
+            time.sleep(delay)
+            self._send_json(200, {
+                "type": "completion",
+                "completion": " " + ANSWER,
+                "stop_reason": "stop_sequence",
+                "model": model
+            })
+            return
+
+        # Streamed: the delay is spread over the chunks, like token generation
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        words = ANSWER.split(" ")
+        size = max(1, len(words) // STREAM_CHUNKS)
+        chunks = [" " + " ".join(words[i:i + size]) for i in range(0, len(words), size)]
+        for i, chunk in enumerate(chunks):
+            time.sleep(delay / len(chunks))
+            event = {
+                "type": "completion",
+                "completion": chunk,
+                "stop_reason": "stop_sequence" if i == len(chunks) - 1 else None,
+                "model": model
+            }
+            self.wfile.write(f"event: completion\ndata: {json.dumps(event)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        self.close_connection = True
+
+
+def serve(host: str = "127.0.0.1", port: int = 8089, latency: float = 0.8, jitter: float = 0.0) -> ThreadingHTTPServer:
+    """Start the stub on a background thread and return the server"""
+    handler = type("Handler", (StubHandler,), {"state": StubState(latency, jitter)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-anthropic", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stub Anthropic completions API with configurable latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.8, help="Seconds per completion (mean)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Standard deviation of the latency, seconds")
+    args = parser.parse_args(argv)
+
+    server = serve(args.host, args.port, args.latency, args.jitter)
+    print(f"Stub Anthropic API on http://{args.host}:{server.server_port} "
+          f"(latency {args.latency}s, jitter {args.jitter}s)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# synthetic_corpus.py
+"""Generate Zendesk-shaped exports of any size for ingestion benchmarks.
+
+Writes articles.json, internal.json, drafts.json and tickets.json in the
+layout ingest.py reads (<out>/processed/<source>/<source>.json). Articles
+have HTML bodies with <h2>/<h3> sections, lists, links, images and the
+occasional table, label lists and draft flags. Tickets have plain-text
+descriptions. The same seed always produces the same corpus.
+
+Usage:
+    python benchmarks/synthetic_corpus.py --documents 10000 --out /tmp/corpus_10k
+    DATA_DIR=/tmp/corpus_10k python ingest.py --chroma-path /tmp/corpus_10k/chroma_db
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, Iterator
+
+# Share of the documents each export gets
+MIX = {"articles": 0.5, "tickets": 0.3, "internal": 0.1, "drafts": 0.1}
+# Published articles in the articles export; the rest are drafts
+PUBLISHED_SHARE = 0.85
+
+PRODUCTS = [
+    "GFI LanGuard", "Kerio Connect", "Kerio Control", "Exinda", "GFI FaxMaker Online",
+    "GFI Archiver", "GFI AppManager", "GFI ClearView", "GFI MailEssentials", "Kerio Operator"
+]
+OBJECTS = [
+    "license", "subscription", "quote", "order", "renewal", "trial key", "invoice",
+    "NFR subscription", "partner account", "credit card", "key file", "credit memo"
+]
+VERBS = ["renew", "generate", "cancel", "update", "transfer", "download", "activate", "co-term", "upgrade", "find"]
+PLACES = ["Accounts Portal", "Partner Portal", "Customer Portal", "Zuora", "KISS", "Zendesk"]
+LABELS = ["NFR", "Renewal", "Licensing", "Orders", "Quotes", "Kerio", "Exinda", "Billing", "Partners", "Trial", "MSP", "SaaS"]
+SECTIONS = ["Situation", "Resolution", "Steps", "Prerequisites", "Notes", "Troubleshooting", "Related articles"]
+SUBSECTIONS = ["Eligibility Criteria", "Before you start", "In the portal", "Via the API", "Common errors"]
+WORDS = (
+    "the customer partner distributor reseller account portal license subscription renewal order quote "
+    "invoice payment term product key activation expiry date seat count billing contact region entity "
+    "support ticket escalation request approval discount price list currency tax status pending active "
+    "suspended cancelled renew generate update verify confirm select open click navigate submit apply "
+    "within after before when if then must should can will manage review check ensure"
+).split()
+TICKET_TYPES = ["question", "incident", "problem", "task"]
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+    if rng.random() < 0.3:
+        words.insert(rng.randrange(len(words)), rng.choice(PRODUCTS))
+    if rng.random() < 0.2:
+        words.insert(rng.randrange(len(words)), f"Manage > {rng.choice(OBJECTS).title()}s")
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def _title(rng: random.Random) -> str:
+    return f"How do I {rng.choice(VERBS)} a {rng.choice(OBJECTS)} for {rng.choice(PRODUCTS)} in the {rng.choice(PLACES)}?"
+
+
+def _body(rng: random.Random, doc_id: int) -> str:
+    parts = []
+    if rng.random() < 0.5:
+        parts.append(f"<p>{_paragraph(rng)}</p>")
+    for n, section in enumerate(rng.sample(SECTIONS, rng.randint(1, 5))):
+        parts.append(f'<h2 id="h_{doc_id}_{n}">{section}</h2>')
+        for _ in range(rng.randint(1, 4)):
+            parts.append(f"<p>{_paragraph(rng)}</p>")
+        if rng.random() < 0.4:
+            items = "".join(f"<li>{_sentence(rng)}</li>" for _ in range(rng.randint(2, 6)))
+            parts.append(f"<ol>{items}</ol>")
+        if rng.random() < 0.3:
+            parts.append(
+                f'<p>See <a href="https://support.example.com/hc/en-us/articles/{rng.randint(10**13, 10**14)}">'
+                f'{_title(rng)}</a> and <img src="https://support.example.com/img/{doc_id}_{n}.png" alt="screenshot"></p>'
+            )
+        if rng.random() < 0.1:
+            rows = "".join(
+                f"<tr><td>{rng.choice(PRODUCTS)}</td><td>{rng.choice(OBJECTS)}</td><td>{rng.randint(1, 500)}</td></tr>"
+                for _ in range(rng.randint(2, 8))
+            )
+            parts.append(f"<table><tbody>{rows}</tbody></table>")
+        if rng.random() < 0.3:
+            parts.append(f'<h3 id="h_{doc_id}_{n}_sub">{rng.choice(SUBSECTIONS)}</h3><p>{_paragraph(rng)}</p>')
+    return "\n".join(parts)
+
+
+def _timestamp(rng: random.Random) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(rng.randint(1_600_000_000, 1_735_000_000)))
+
+
+def article(rng: random.Random, doc_id: int, draft: bool, internal: bool = False) -> Dict:
+    title = _title(rng) + (" [Internal]" if internal else "")
+    created = _timestamp(rng)
+    return {
+        "id": doc_id,
+        "url": f"https://example.zendesk.com/api/v2/help_center/en-us/articles/{doc_id}.json",
+        "html_url": f"https://support.example.com/hc/en-us/articles/{doc_id}",
+        "title": title,
+        "name": title,
+        "draft": draft,
+        "promoted": False,
+        "section_id": rng.randint(10**13, 10**14),
+        "created_at": created,
+        "updated_at": created,
+        "locale": "en-us",
+        "label_names": rng.sample(LABELS, rng.randint(0, 4)),
+        "body": _body(rng, doc_id)
+    }
+
+
+def ticket(rng: random.Random, doc_id: int) -> Dict:
+    return {
+        "id": doc_id,
+        "subject": f"Cannot {rng.choice(VERBS)} {rng.choice(OBJECTS)} for {rng.choice(PRODUCTS)}",
+        "type": rng.choice(TICKET_TYPES),
+        "status": rng.choice(["new", "open", "pending", "solved", "closed"]),
+        "created_at": _timestamp(rng),
+        "tags": rng.sample([label.lower() for label in LABELS], rng.randint(0, 3)),
+        "description": "\n\n".join(_paragraph(rng) for _ in range(rng.randint(1, 4)))
+    }
+
+
+def _items(source: str, count: int, rng: random.Random, first_id: int) -> Iterator[Dict]:
+    for n in range(count):
+        doc_id = first_id + n
+        if source == "tickets":
+            yield ticket(rng, doc_id)
+        elif source == "articles":
+            yield article(rng, doc_id, draft=rng.random() >= PUBLISHED_SHARE)
+        elif source == "internal":
+            yield article(rng, doc_id, draft=False, internal=True)
+        else:
+            yield article(rng, doc_id, draft=True)
+
+
+def write_export(path: str, key: str, items: Iterator[Dict], count: int):
+    """Write a Zendesk-style {"count": n, "<key>": [...]} export one item at a time"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'{{"count": {count}, "{key}": [\n')
+        for n, item in enumerate(items):
+            if n:
+                f.write(",\n")
+            f.write(json.dumps(item))
+        f.write("\n]}\n")
+
+
+def generate_corpus(out_dir: str, documents: int, seed: int = 0) -> Dict:
+    """Write all four exports under out_dir/processed; returns counts and sizes"""
+    start_time = time.time()
+    rng = random.Random(seed)
+    counts = {source: int(documents * share) for source, share in MIX.items()}
+    counts["articles"] += documents - sum(counts.values())
+
+    exports = {}
+    first_id = 10**13
+    for source, count in counts.items():
+        path = os.path.join(out_dir, "processed", source, f"{source}.json")
+        key = "tickets" if source == "tickets" else "articles"
+        write_export(path, key, _items(source, count, rng, first_id), count)
+        first_id += count
+        exports[source] = {"documents": count, "mb": round(os.path.getsize(path) / (1024 * 1024), 2)}
+
+    return {
+        "documents": documents,
+        "seed": seed,
+        "exports": exports,
+        "mb": round(sum(export["mb"] for export in exports.values()), 2),
+        "seconds": round(time.time() - start_time, 3)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Zendesk export corpus")
+    parser.add_argument("--documents", type=int, default=1000, help="Total documents across all exports")
+    parser.add_argument("--out", required=True, help="Output DATA_DIR (exports go to <out>/processed)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    corpus = generate_corpus(args.out, args.documents, args.seed)
+    print(f"Wrote {corpus['documents']} documents ({corpus['mb']:.1f} MB) to {args.out} in {corpus['seconds']:.2f}s")
+    for source, export in corpus["exports"].items():
+        print(f"  {source:<9} {export['documents']:>8} documents, {export['mb']:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
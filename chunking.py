@@ -0,0 +1,117 @@
+# chunking.py
+"""Split Zendesk article bodies into section passages.
+
+Articles are cut at their <h2>/<h3> headings, each section is converted to
+text, sections shorter than CHUNK_MIN_CHARS are folded into the next one
+and sections longer than CHUNK_MAX_CHARS are split on paragraph (then
+word) boundaries, so every passage embeds one topic and fits the prompt.
+"""
+import html
+import os
+import re
+from typing import List, NamedTuple
+
+from ingest_pipeline import html_to_text
+
+CHUNK_MAX_CHARS = int(os.getenv('CHUNK_MAX_CHARS', '2000'))
+CHUNK_MIN_CHARS = int(os.getenv('CHUNK_MIN_CHARS', '200'))
+# Bump when the same article would be cut into different passages; with the
+# size limits it is recorded in the delta manifest, and ingest.py --delta
+# re-chunks every article once when it changes
+CHUNKER_VERSION = 1
+CHUNK_FORMAT = f"v{CHUNKER_VERSION}:{CHUNK_MAX_CHARS}:{CHUNK_MIN_CHARS}"
+
+_HEADING_RE = re.compile(r"<h([23])\b([^>]*)>(.*?)</h\1\s*>", re.IGNORECASE | re.DOTALL)
+_ANCHOR_RE = re.compile(r"""\bid\s*=\s*["']([^"']+)["']""", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+class Passage(NamedTuple):
+    section: str  # Heading path, e.g. "Resolution > 1. Eligibility Criteria"
+    anchor: str   # Heading id for linking into the article, or ''
+    text: str
+
+
+def _heading_text(markup: str) -> str:
+    return " ".join(html.unescape(_TAG_RE.sub(" ", markup)).split())
+
+
+def split_sections(body: str) -> List[Passage]:
+    """Cut an HTML body at <h2>/<h3> headings into (section, anchor, html) parts.
+
+    Content before the first heading is kept with an empty section. An
+    <h3> is named under the <h2> it follows.
+    """
+    sections = []
+    h2 = ''
+    section, anchor, start = '', '', 0
+    for match in _HEADING_RE.finditer(body or ''):
+        sections.append(Passage(section, anchor, body[start:match.start()]))
+        level, attrs, title = match.groups()
+        title = _heading_text(title)
+        if level == '2':
+            h2 = title
+            section = title
+        else:
+            section = f"{h2} > {title}" if h2 else title
+        anchor_match = _ANCHOR_RE.search(attrs)
+        anchor = anchor_match.group(1) if anchor_match else ''
+        start = match.end()
+    sections.append(Passage(section, anchor, (body or '')[start:]))
+    return sections
+
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    """Split text into pieces of at most max_chars on paragraph, then word, boundaries"""
+    pieces, current = [], ''
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) > max_chars:
+            words = paragraph.split()
+            paragraph, rest = '', []
+            for word in words:
+                if paragraph and len(paragraph) + 1 + len(word) > max_chars:
+                    rest.append(paragraph)
+                    paragraph = word
+                else:
+                    paragraph = f"{paragraph} {word}" if paragraph else word
+            for full in rest:
+                if current:
+                    pieces.append(current)
+                    current = ''
+                pieces.append(full)
+        if current and len(current) + 2 + len(paragraph) > max_chars:
+            pieces.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_article(body: str, max_chars: int = CHUNK_MAX_CHARS, min_chars: int = CHUNK_MIN_CHARS) -> List[Passage]:
+    """Passages of an article body in reading order; empty sections are dropped"""
+    passages = []
+    carry = None  # Short section waiting to be folded into the next one
+    for section, anchor, markup in split_sections(body):
+        text = html_to_text(markup).strip()
+        if not text:
+            continue
+        if carry is not None:
+            heading = f"{section}\n\n" if section else ''
+            combined = f"{carry.text}\n\n{heading}{text}"
+            if len(combined) <= max_chars:
+                section, anchor, text = carry.section, carry.anchor, combined
+            else:
+                passages.append(carry)
+            carry = None
+        if len(text) < min_chars:
+            carry = Passage(section, anchor, text)
+            continue
+        passages.extend(Passage(section, anchor, piece) for piece in _split_long(text, max_chars))
+    if carry is not None:
+        passages.append(carry)
+    return passages
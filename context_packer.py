@@ -0,0 +1,119 @@
+# context_packer.py
+"""Fit retrieved references into a token budget for the Claude prompt.
+
+References arrive ranked best first. Each is stripped of the header lines
+the loaders put in front of the text (Title:, URL:, Labels:, ...; the
+prompt already names the reference), duplicates and near-duplicates of a
+better-ranked reference are dropped, and the rest are added until
+CONTEXT_TOKEN_BUDGET is spent. A reference that does not fit is cut to
+the remaining budget when at least MIN_TRUNCATED_TOKENS remain.
+"""
+import hashlib
+import math
+import os
+import re
+from typing import Dict, List, NamedTuple
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '3000'))
+# Claude tokenizes English support text at roughly four characters a token
+CHARS_PER_TOKEN = float(os.getenv('CONTEXT_CHARS_PER_TOKEN', '4'))
+MIN_TRUNCATED_TOKENS = int(os.getenv('CONTEXT_MIN_TRUNCATED_TOKENS', '100'))
+# Word-trigram Jaccard similarity at which two references are the same text
+NEAR_DUPLICATE_SIMILARITY = float(os.getenv('CONTEXT_NEAR_DUPLICATE_SIMILARITY', '0.8'))
+
+_HEADER_RE = re.compile(r"^\s*(Title|Section|URL|Labels|Subject|Type):.*$")
+_BODY_LABEL_RE = re.compile(r"^\s*(Content|Description):\s*")
+
+
+class PackedContext(NamedTuple):
+    references: List[Dict]
+    report: Dict
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def strip_boilerplate(document: str) -> str:
+    """Drop the loaders' header lines and body label, and de-indent the rest"""
+    lines = (document or '').strip('\n').split('\n')
+    while lines and (not lines[0].strip() or _HEADER_RE.match(lines[0])):
+        lines.pop(0)
+    if lines:
+        lines[0] = _BODY_LABEL_RE.sub('', lines[0])
+    text = "\n".join(line.strip() for line in lines)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < 3:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def _similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _truncate(text: str, tokens: int) -> str:
+    """Cut text to about ``tokens`` tokens, at a word boundary"""
+    cut = text[:max(0, int(tokens * CHARS_PER_TOKEN) - len(" ..."))]
+    if len(cut) < len(text) and ' ' in cut:
+        cut = cut[:cut.rindex(' ')]
+    return cut.rstrip() + " ..."
+
+
+def pack_context(references: List[Dict], budget: int = CONTEXT_TOKEN_BUDGET,
+                 similarity: float = NEAR_DUPLICATE_SIMILARITY) -> PackedContext:
+    """Choose and trim references, best first, to fit ``budget`` tokens.
+
+    Returns copies of the kept references with ``content`` replaced by the
+    packed text and a ``tokens`` estimate, plus a report of tokens used and
+    what was dropped.
+    """
+    packed = []
+    kept_hashes = set()
+    kept_shingles = []
+    used = 0
+    duplicates = over_budget = truncated = 0
+    retrieved_tokens = 0
+
+    for ref in references:
+        text = strip_boilerplate(ref.get('content', ''))
+        tokens = estimate_tokens(text)
+        retrieved_tokens += estimate_tokens(ref.get('content', ''))
+        if not text:
+            continue
+
+        digest = hashlib.sha256(" ".join(text.lower().split()).encode('utf-8')).hexdigest()
+        shingles = _shingles(text)
+        if digest in kept_hashes or any(_similarity(shingles, kept) >= similarity for kept in kept_shingles):
+            duplicates += 1
+            continue
+
+        remaining = budget - used
+        if tokens > remaining:
+            if remaining < MIN_TRUNCATED_TOKENS:
+                over_budget += 1
+                continue
+            text = _truncate(text, remaining)
+            tokens = estimate_tokens(text)
+            truncated += 1
+
+        kept_hashes.add(digest)
+        kept_shingles.append(shingles)
+        used += tokens
+        packed.append({**ref, 'content': text, 'tokens': tokens})
+
+    return PackedContext(packed, {
+        "budget": budget,
+        "tokens": used,
+        "retrieved_tokens": retrieved_tokens,
+        "references": len(packed),
+        "duplicates_dropped": duplicates,
+        "over_budget_dropped": over_budget,
+        "truncated": truncated
+    })
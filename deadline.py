@@ -0,0 +1,54 @@
+# deadline.py
+import os
+import time
+from typing import Optional
+
+# Default time budget for one /answer request; 0 disables deadlines
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', '30'))
+# Largest budget a request body may ask for
+MAX_REQUEST_DEADLINE_SECONDS = float(os.getenv('MAX_REQUEST_DEADLINE_SECONDS', '120'))
+# Share of the budget collection queries get; slower collections are left out
+RETRIEVAL_DEADLINE_SHARE = float(os.getenv('RETRIEVAL_DEADLINE_SHARE', '0.25'))
+# Claude is not called with less than this left: the answer could not finish
+MIN_GENERATE_SECONDS = float(os.getenv('MIN_GENERATE_SECONDS', '2'))
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """Time budget for one request, counted from when it was created"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    @classmethod
+    def from_request(cls, seconds=None) -> Optional['Deadline']:
+        """The request's deadline_seconds, or the configured default (None if disabled).
+
+        Raises ValueError for a value that is not a positive number.
+        """
+        if seconds is None:
+            return cls(REQUEST_DEADLINE_SECONDS) if REQUEST_DEADLINE_SECONDS > 0 else None
+        if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or seconds <= 0:
+            raise ValueError("deadline_seconds must be a positive number")
+        return cls(min(float(seconds), MAX_REQUEST_DEADLINE_SECONDS))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def retrieval_timeout(self) -> float:
+        """Seconds collection queries may take"""
+        return min(self.remaining(), self.seconds * RETRIEVAL_DEADLINE_SHARE)
+
+    def generation_timeout(self) -> float:
+        """Seconds left for Claude; raises DeadlineExceeded when too few for an answer"""
+        remaining = self.remaining()
+        if remaining < MIN_GENERATE_SECONDS:
+            raise DeadlineExceeded(f"{remaining:.2f}s left of the {self.seconds:g}s deadline, too little to answer")
+        return remaining
@@ -0,0 +1,193 @@
+# delta_sync.py
+import hashlib
+import json
+import os
+from functools import partial
+
+from chunking import CHUNK_FORMAT
+from ingest_pipeline import INGEST_WORKERS, run_pipeline
+
+# Manifests live inside the Chroma directory so they are removed with it
+MANIFEST_DIR = "manifests"
+# Ids per collection.delete call when pruning removed documents
+DELETE_BATCH_SIZE = 500
+# Shape of the records written for an item; entries written with another
+# format (or before formats were recorded, i.e. whole-article records) are
+# reprocessed even when the item's updated_at is unchanged
+RECORD_FORMAT = f"chunks-{CHUNK_FORMAT}"
+
+
+def content_hash(document, metadata):
+    """Stable hash of a record's document text and metadata"""
+    digest = hashlib.sha256()
+    digest.update(document.encode('utf-8'))
+    digest.update(json.dumps(metadata, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Per-collection record of what is currently stored in ChromaDB.
+
+    Entries are keyed by the source item id (the Zendesk article or ticket
+    id) and hold the Chroma record ids written for it (one per section
+    passage for chunked articles), the item's ``updated_at``, the content
+    hash of what was written and the RECORD_FORMAT it was written in.
+    """
+
+    def __init__(self, path, entries=None):
+        self.path = path
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(path, json.load(f))
+        except FileNotFoundError:
+            return cls(path)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def manifest_path(chroma_path, collection_name):
+    return os.path.join(chroma_path, MANIFEST_DIR, f"{collection_name}.json")
+
+
+def load_manifest(chroma_path, collection):
+    """Load the manifest for a collection, discarding it if it is stale"""
+    manifest = Manifest.load(manifest_path(chroma_path, collection.name))
+    if len(manifest) and collection.count() == 0:
+        # Collection was dropped or recreated behind our back
+        manifest.entries = {}
+    return manifest
+
+
+def reset_manifest(chroma_path, collection_name):
+    """Forget everything recorded for a collection (after a full reset)"""
+    try:
+        os.remove(manifest_path(chroma_path, collection_name))
+    except FileNotFoundError:
+        pass
+
+
+def _source_id(item):
+    item_id = item.get('id') if isinstance(item, dict) else None
+    return None if item_id is None else str(item_id)
+
+
+def _prepare_tracked(item, prepare):
+    """Run the loader's prepare() and tag its records with their source item"""
+    source_id = _source_id(item)
+    updated_at = item.get('updated_at', '') if isinstance(item, dict) else ''
+    records = prepare(item)
+    if not records:
+        # Tombstone: the item exists but does not produce a document
+        records = [{"id": None}]
+    elif not isinstance(records, list):
+        records = [records]
+    for record in records:
+        record["source_id"] = source_id
+        record["updated_at"] = updated_at or ''
+    return records
+
+
+def _group_hash(digests):
+    """Hash of everything written for one item (the record hash when there is one)"""
+    if len(digests) == 1:
+        return digests[0]
+    return hashlib.sha256("".join(digests).encode('utf-8')).hexdigest()
+
+
+def sync_collection(collection, items, prepare, manifest, batch_size=10, workers=INGEST_WORKERS,
+                    label='document', on_batch=None, log=print, embedding_cache=None,
+                    stats=None, batcher=None):
+    """Bring a collection in line with an export, touching only what changed.
+
+    Items whose ``updated_at`` and record format match the manifest are
+    skipped before HTML conversion. Converted records whose content hash is unchanged are not
+    re-embedded. New and changed records are upserted, and records whose
+    source item disappeared (or is now filtered out) are deleted. With an
+    empty manifest this is a full load. Returns a dict of counts.
+    """
+    entries = manifest.entries
+    seen = set()
+    counts = {"upserted": 0, "unchanged": 0, "deleted": 0}
+
+    def changed_items():
+        for item in items:
+            source_id = _source_id(item)
+            if source_id is not None:
+                seen.add(source_id)
+                entry = entries.get(source_id)
+                updated_at = item.get('updated_at')
+                if (entry and updated_at and entry.get('updated_at') == updated_at
+                        and entry.get('format') == RECORD_FORMAT):
+                    counts["unchanged"] += 1
+                    continue
+            yield item
+
+    def accept(records):
+        for record in records:
+            source_id = record.pop("source_id")
+            updated_at = record.pop("updated_at")
+        if records[0]["id"] is None:
+            # Remember filtered-out items too, so unchanged ones are skipped next run
+            if source_id is not None:
+                stale_ids = (entries.get(source_id) or {}).get("ids", [])
+                if stale_ids:
+                    collection.delete(ids=stale_ids)
+                    counts["deleted"] += len(stale_ids)
+                entries[source_id] = {"ids": [], "updated_at": updated_at, "hash": None, "format": RECORD_FORMAT}
+            return []
+        for record in records:
+            record["metadata"]["content_hash"] = content_hash(record["document"], record["metadata"])
+        ids = [record["id"] for record in records]
+        digest = _group_hash([record["metadata"]["content_hash"] for record in records])
+        entry = entries.get(source_id)
+        if source_id is not None:
+            # Passages that no longer exist (the article got shorter or was re-chunked)
+            stale_ids = [i for i in (entry or {}).get("ids", []) if i not in ids]
+            if stale_ids:
+                collection.delete(ids=stale_ids)
+                counts["deleted"] += len(stale_ids)
+            entries[source_id] = {"ids": ids, "updated_at": updated_at, "hash": digest, "format": RECORD_FORMAT}
+        if entry and entry.get("hash") == digest and entry.get("ids") == ids:
+            counts["unchanged"] += 1
+            return []
+        return records
+
+    counts["upserted"] = run_pipeline(
+        collection,
+        changed_items(),
+        partial(_prepare_tracked, prepare=prepare),
+        batch_size=batch_size,
+        workers=workers,
+        label=label,
+        on_batch=on_batch,
+        log=log,
+        method='upsert',
+        accept=accept,
+        embedding_cache=embedding_cache,
+        stats=stats,
+        batcher=batcher
+    )
+
+    # Prune documents whose source item is gone
+    removed = [source_id for source_id in entries if source_id not in seen]
+    removed_ids = [record_id for source_id in removed for record_id in entries[source_id]["ids"]]
+    for i in range(0, len(removed_ids), DELETE_BATCH_SIZE):
+        collection.delete(ids=removed_ids[i:i + DELETE_BATCH_SIZE])
+    for source_id in removed:
+        del entries[source_id]
+    counts["deleted"] += len(removed_ids)
+
+    manifest.save()
+    return counts
@@ -0,0 +1,227 @@
+# embedding_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+# Model used by ChromaDB's default embedding function
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', DEFAULT_EMBEDDING_MODEL)
+# Upper bound on stored vectors before least recently used ones are evicted
+EMBEDDING_CACHE_MAX_MB = int(os.getenv('EMBEDDING_CACHE_MAX_MB', '512'))
+CACHE_FILENAME = "embedding_cache.sqlite3"
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def get_embedding_function(model=EMBEDDING_MODEL):
+    """Return the ChromaDB embedding function for a model id"""
+    from chromadb.utils import embedding_functions
+
+    if model == DEFAULT_EMBEDDING_MODEL:
+        return embedding_functions.DefaultEmbeddingFunction()
+    return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model)
+
+
+def preload_embedding_function(embedding_function):
+    """Load model files without running the model.
+
+    Used in a preforking server's master: ONNX Runtime inference threads do
+    not survive fork, so the ONNX session itself is built in each worker,
+    while downloaded files, the tokenizer and SentenceTransformer weights
+    (loaded by its constructor) are shared copy-on-write.
+    """
+    if hasattr(embedding_function, '_download_model_if_not_exists'):
+        embedding_function._download_model_if_not_exists()
+        embedding_function.tokenizer
+
+
+def reset_embedding_function(embedding_function):
+    """Drop an ONNX session inherited across fork so the worker builds its own"""
+    vars(embedding_function).pop('model', None)
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def cache_path_for(chroma_path):
+    """Cache file lives next to the Chroma directory so collection resets keep it"""
+    return os.path.join(os.path.dirname(os.path.abspath(chroma_path)), CACHE_FILENAME)
+
+
+class EmbeddingCache:
+    """On-disk cache of embeddings keyed by (model id, hash of document text).
+
+    ``embed(texts)`` returns one vector per text, computing only the ones
+    not already cached. Entries are evicted least-recently-used first once
+    the stored vectors exceed ``max_bytes``.
+    """
+
+    def __init__(self, path, model=EMBEDDING_MODEL, embedding_function=None,
+                 max_bytes=EMBEDDING_CACHE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.model = model
+        self.max_bytes = max_bytes
+        self._embedding_function = embedding_function
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                key TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, key)
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._db.commit()
+        self._size = self._db.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    @classmethod
+    def for_chroma_path(cls, chroma_path, **kwargs):
+        return cls(cache_path_for(chroma_path), **kwargs)
+
+    @property
+    def embedding_function(self):
+        if self._embedding_function is None:
+            self._embedding_function = get_embedding_function(self.model)
+        return self._embedding_function
+
+    def _lookup(self, keys):
+        found = {}
+        for i in range(0, len(keys), _LOOKUP_BATCH):
+            chunk = keys[i:i + _LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                [self.model, *chunk]
+            )
+            for key, blob in rows:
+                vector = array('f')
+                vector.frombytes(blob)
+                found[key] = vector.tolist()
+        return found
+
+    def get(self, texts):
+        """Return cached vectors for texts (None where missing) without embedding"""
+        keys = [text_hash(text) for text in texts]
+        with self._lock:
+            found = self._lookup(list(set(keys)))
+        return [found.get(key) for key in keys]
+
+    def put(self, texts, vectors):
+        """Store vectors computed elsewhere (e.g. copied from another collection)"""
+        now = time.time()
+        rows = [
+            (self.model, text_hash(text), array('f', vector).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._store(rows)
+
+    def _store(self, rows):
+        keys = [row[1] for row in rows]
+        existing = 0
+        for i in range(0, len(keys), _LOOKUP_BATCH):
+            chunk = keys[i:i + _LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(chunk))
+            existing += self._db.execute(
+                f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings "
+                f"WHERE model = ? AND key IN ({placeholders})",
+                [self.model, *chunk]
+            ).fetchone()[0]
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, key, vector, last_used) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        self._size += sum(len(row[2]) for row in rows) - existing
+        self._evict()
+        self._db.commit()
+
+    def _evict(self):
+        """Drop least recently used vectors until the cache is back under 90% of its bound"""
+        if self._size <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        while self._size > target:
+            rows = self._db.execute(
+                "SELECT model, key, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                return
+            for model, key, size in rows:
+                if self._size <= target:
+                    break
+                self._db.execute("DELETE FROM embeddings WHERE model = ? AND key = ?", (model, key))
+                self._size -= size
+                self.evictions += 1
+
+    def embed(self, texts):
+        """Return embeddings for texts, consulting the cache before the model"""
+        texts = list(texts)
+        keys = [text_hash(text) for text in texts]
+        with self._lock:
+            found = self._lookup(list(set(keys)))
+            if found:
+                self._db.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND key = ?",
+                    [(time.time(), self.model, key) for key in found]
+                )
+                self._db.commit()
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        self.hits += len(texts) - sum(1 for key in keys if key in missing)
+        self.misses += sum(1 for key in keys if key in missing)
+
+        if missing:
+            vectors = self.embedding_function(list(missing.values()))
+            computed = {key: [float(x) for x in vector] for key, vector in zip(missing, vectors)}
+            now = time.time()
+            with self._lock:
+                self._store([
+                    (self.model, key, array('f', vector).tobytes(), now)
+                    for key, vector in computed.items()
+                ])
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_mb": self._size / (1024 * 1024)
+        }
+
+    def summary(self):
+        """One-line hit/miss report for loader output"""
+        stats = self.stats()
+        return (
+            f"Embedding cache ({stats['model']}): {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%} hit rate), {stats['evictions']} evicted, {stats['size_mb']:.1f} MB"
+        )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
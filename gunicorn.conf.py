@@ -0,0 +1,30 @@
+# gunicorn.conf.py
+"""Gunicorn settings, read automatically from the working directory.
+
+By default each worker imports the app and loads its own SupportSystem on
+a background thread, so / and /health answer as soon as the worker is up.
+
+GUNICORN_PRELOAD=1 trades that for memory: the master builds the
+SupportSystem once (Chroma indexes, lexical index, embedding model files)
+and workers share it copy-on-write. Each worker then opens its own SQLite
+connections, model session and Anthropic client and runs a warm-up query
+before /ready turns green. The master loads everything before it binds, so
+nothing, /health included, answers until the load has finished.
+"""
+import os
+import sys
+
+preload_app = os.getenv('GUNICORN_PRELOAD', '0') == '1'
+
+if preload_app:
+    # Tells app.py (also served as src.app) it is being imported by the master
+    os.environ['PRELOAD_APP'] = '1'
+    # HuggingFace tokenizers must not start threads before the fork
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+
+def post_fork(server, worker):
+    # src/app.py re-exports app.py, so the SupportSystem always lives in 'app'
+    support_system = getattr(sys.modules.get('app'), 'support_system', None)
+    if support_system is not None:
+        support_system.after_fork()
@@ -0,0 +1,368 @@
+# ingest.py
+"""Load Zendesk exports into the support_* ChromaDB collections.
+
+Usage:
+    python ingest.py                      # rebuild all four collections
+    python ingest.py articles tickets     # rebuild only these sources
+    python ingest.py --delta              # sync only what changed
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from functools import partial
+
+import chromadb
+
+from chunking import chunk_article
+from delta_sync import load_manifest, reset_manifest, sync_collection
+from embedding_cache import EmbeddingCache, get_embedding_function
+from lexical_index import build_index, index_path_for
+from ingest_pipeline import (
+    INGEST_WORKERS,
+    MAX_BATCH_SIZE,
+    MEMORY_LIMIT_MB,
+    MIN_BATCH_SIZE,
+    AdaptiveBatcher,
+    PipelineStats,
+    peak_rss_mb,
+)
+from zendesk_reader import ExportReader
+
+# File paths
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(PROJECT_DIR, "src", "data"))
+PROCESSED_DIR = os.path.join(DATA_DIR, "processed")
+CHROMA_PATH = os.getenv('CHROMA_PATH', os.path.join(DATA_DIR, "chroma_db"))
+
+
+def log_status(message, important=False):
+    """Log status with timestamp"""
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    if important:
+        print("\n" + "="*50)
+        print(f"[{timestamp}] {message}")
+        print("="*50 + "\n")
+    else:
+        print(f"[{timestamp}] {message}")
+
+
+def article_records(article, prefix, metadata):
+    """One ChromaDB record per section passage of an article body, or None if it is empty"""
+    passages = chunk_article(article.get('body', ''))
+    url = article.get('html_url', '')
+    parent_id = f"{prefix}_{article['id']}"
+
+    records = []
+    for index, passage in enumerate(passages):
+        doc_text = f"""
+                Title: {article.get('title', 'No Title')}
+                Section: {passage.section}
+                URL: {url or 'No URL'}
+                Labels: {', '.join(article.get('label_names', []))}
+                Content: {passage.text}
+                """
+
+        records.append({
+            "id": f"{parent_id}#{index}",
+            "document": doc_text,
+            "metadata": {
+                **metadata,
+                "url": f"{url}#{passage.anchor}" if url and passage.anchor else url,
+                "parent_id": parent_id,
+                "section": passage.section,
+                "chunk_index": index,
+                "chunk_count": len(passages)
+            }
+        })
+    return records or None
+
+
+def prepare_article(article):
+    """Build the ChromaDB records for a published article, or None to skip it"""
+    if article.get('draft', True):
+        return None
+
+    return article_records(article, "article", {
+        "type": "article",
+        "id": str(article['id']),
+        "title": article.get('title', 'No Title')
+    })
+
+
+def prepare_ticket(ticket):
+    """Build the ChromaDB record for a ticket, or None to skip it"""
+    if not ticket.get('description'):
+        return None
+
+    doc_text = f"""
+                Subject: {ticket.get('subject', 'No Subject')}
+                Type: {ticket.get('type', 'No Type')}
+                Description: {ticket.get('description', '')}
+                """
+
+    return {
+        "id": f"ticket_{ticket['id']}",
+        "document": doc_text,
+        "metadata": {
+            "type": "ticket",
+            "id": str(ticket['id']),
+            "subject": ticket.get('subject', 'No Subject')
+        }
+    }
+
+
+def prepare_help_center_article(article, doc_type):
+    """Build the ChromaDB records for an internal or draft article"""
+    if doc_type == 'internal' and article.get('draft', True):
+        return None
+    elif doc_type == 'drafts' and not article.get('draft', False):
+        return None
+
+    return article_records(article, doc_type, {
+        "type": doc_type,
+        "id": str(article['id']),
+        "title": article.get('title', 'No Title'),
+        # Chroma metadata values must be scalars
+        "labels": ';'.join(article.get('label_names', [])),
+        "created_at": article.get('created_at', ''),
+        "updated_at": article.get('updated_at', '')
+    })
+
+
+class Source:
+    """Where a collection's documents come from and how to build them"""
+
+    def __init__(self, name, collection, path, key, prepare, convert_in_pool=True):
+        self.name = name
+        self.collection = collection
+        self.path = path
+        self.key = key
+        self.prepare = prepare
+        # Plain-text sources gain nothing from the HTML process pool
+        self.convert_in_pool = convert_in_pool
+
+
+SOURCES = {
+    "articles": Source(
+        "articles", "support_articles",
+        os.path.join(PROCESSED_DIR, "articles", "articles.json"), "articles",
+        prepare_article
+    ),
+    "tickets": Source(
+        "tickets", "support_tickets",
+        os.path.join(PROCESSED_DIR, "tickets", "tickets.json"), "tickets",
+        prepare_ticket, convert_in_pool=False
+    ),
+    "internal": Source(
+        "internal", "support_internal",
+        os.path.join(PROCESSED_DIR, "internal", "internal.json"), "articles",
+        partial(prepare_help_center_article, doc_type="internal")
+    ),
+    "drafts": Source(
+        "drafts", "support_drafts",
+        os.path.join(PROCESSED_DIR, "drafts", "drafts.json"), "articles",
+        partial(prepare_help_center_article, doc_type="drafts")
+    ),
+}
+
+
+def open_collection(client, source, delta, chroma_path, embedding_function):
+    """Get the collection for a source, dropping it first unless syncing"""
+    if not delta:
+        try:
+            client.delete_collection(source.collection)
+        except Exception:
+            pass
+        reset_manifest(chroma_path, source.collection)
+    return client.get_or_create_collection(source.collection, embedding_function=embedding_function)
+
+
+def ingest_source(client, source, delta=False, chroma_path=CHROMA_PATH, embedding_cache=None,
+                  workers=INGEST_WORKERS, batcher=None, stats=None):
+    """Load one source into its collection and return a result summary"""
+    log_status(f"Loading {source.name} into {source.collection}", important=True)
+    start_time = time.time()
+
+    if embedding_cache is not None:
+        embedding_function = embedding_cache.embedding_function
+    else:
+        # Passing None would leave the collection without an embedding function
+        embedding_function = get_embedding_function()
+    collection = open_collection(client, source, delta, chroma_path, embedding_function)
+    manifest = load_manifest(chroma_path, collection)
+    log_status(f"Manifest tracks {len(manifest)} {source.name} already in ChromaDB")
+
+    items = ExportReader(source.path, source.key)
+    log_status(f"Streaming {source.path} ({items.progress()})")
+
+    def report_batch(count):
+        elapsed = time.time() - start_time
+        rate = count / elapsed if elapsed > 0 else 0
+        batch_size = f", batch size {batcher.size}" if batcher is not None else ""
+        log_status(f"Queued {count} {source.name} ({items.progress()}, {rate:.2f} docs/sec{batch_size})")
+
+    source_stats = PipelineStats()
+    result = sync_collection(
+        collection,
+        items,
+        source.prepare,
+        manifest,
+        workers=workers if source.convert_in_pool else 0,
+        label=source.name.rstrip('s'),
+        on_batch=report_batch,
+        log=log_status,
+        embedding_cache=embedding_cache,
+        stats=source_stats,
+        batcher=batcher
+    )
+    if stats is not None:
+        stats.merge(source_stats)
+
+    result["seconds"] = round(time.time() - start_time, 3)
+    result["count"] = collection.count()
+    result["stages"] = source_stats.as_dict()
+    log_status(
+        f"{source.name.title()} complete: {result['upserted']} upserted, {result['unchanged']} unchanged, "
+        f"{result['deleted']} deleted, {result['count']} in collection ({result['seconds']:.2f}s)"
+    )
+    return result
+
+
+def run(source_names, chroma_path=CHROMA_PATH, delta=False, workers=INGEST_WORKERS,
+        use_cache=True, batch_size=MIN_BATCH_SIZE, max_batch_size=MAX_BATCH_SIZE,
+        memory_limit_mb=MEMORY_LIMIT_MB):
+    """Ingest the named sources and return a summary of the run.
+
+    A source that fails (say its export is still a Git LFS pointer) is
+    logged and listed under ``failed``; the others are still loaded.
+    """
+    log_status(f"Starting {'delta sync' if delta else 'full rebuild'} of {', '.join(source_names)}", important=True)
+    start_time = time.time()
+
+    client = chromadb.PersistentClient(path=chroma_path)
+    log_status(f"ChromaDB path: {chroma_path}")
+    embedding_cache = EmbeddingCache.for_chroma_path(chroma_path) if use_cache else None
+    batcher = AdaptiveBatcher(
+        initial=batch_size,
+        min_size=min(batch_size, MIN_BATCH_SIZE),
+        max_size=max_batch_size,
+        memory_limit_mb=memory_limit_mb
+    )
+    stats = PipelineStats()
+
+    results = {}
+    failed = {}
+    for name in source_names:
+        source = SOURCES[name]
+        if not os.path.exists(source.path):
+            log_status(f"Skipping {name}: {source.path} not found")
+            continue
+        try:
+            results[name] = ingest_source(
+                client, source, delta=delta, chroma_path=chroma_path,
+                embedding_cache=embedding_cache, workers=workers, batcher=batcher, stats=stats
+            )
+        except Exception as e:
+            failed[name] = str(e)
+            log_status(f"Failed to load {name}: {str(e)}", important=True)
+
+    # The lexical index spans every collection, so rebuild it whenever one changed
+    # (a failed source may have been dropped or partly synced)
+    index_path = index_path_for(chroma_path)
+    lexical_index = None
+    changed = any(result['upserted'] or result['deleted'] for result in results.values())
+    if changed or failed or not os.path.exists(index_path):
+        collections = {name: source.collection for name, source in SOURCES.items()}
+        lexical_index = build_index(client, collections, index_path, log=log_status)
+
+    summary = {
+        "mode": "delta" if delta else "full",
+        "seconds": round(time.time() - start_time, 3),
+        "sources": results,
+        "failed": failed,
+        "stages": stats.as_dict(),
+        "peak_batch_size": batcher.peak_size,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else None,
+        "lexical_index": lexical_index
+    }
+
+    log_status("Ingestion Complete!", important=True)
+    for name, result in results.items():
+        log_status(f"{name.title()}: {result['upserted']} upserted, {result['count']} in collection")
+    log_status("Throughput per stage:")
+    for line in stats.report():
+        log_status(f"  {line}")
+    log_status(f"Peak batch size: {batcher.peak_size}, peak RSS: {summary['peak_rss_mb']:.0f} MB")
+    if embedding_cache is not None:
+        log_status(embedding_cache.summary())
+    log_status(f"Total time: {summary['seconds']:.2f} seconds")
+    for name, error in failed.items():
+        log_status(f"{name.title()} FAILED: {error}")
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load Zendesk exports into ChromaDB")
+    parser.add_argument(
+        "sources",
+        nargs="*",
+        metavar="source",
+        help=f"Sources to load: {', '.join(SOURCES)} (default: all)"
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Upsert only new/changed documents and delete removed ones instead of rebuilding"
+    )
+    parser.add_argument("--chroma-path", default=CHROMA_PATH, help="ChromaDB directory")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=INGEST_WORKERS,
+        help="HTML conversion processes (0 converts in-process)"
+    )
+    parser.add_argument("--batch-size", type=int, default=MIN_BATCH_SIZE, help="Initial batch size")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE, help="Largest adaptive batch")
+    parser.add_argument(
+        "--memory-limit-mb",
+        type=int,
+        default=MEMORY_LIMIT_MB,
+        help="Shrink batches while resident memory is above this"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the embedding cache")
+    parser.add_argument("--summary", metavar="PATH", help="Also write the run summary to this JSON file")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.sources if name not in SOURCES]
+    if unknown:
+        parser.error(f"unknown source(s): {', '.join(unknown)}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        summary = run(
+            args.sources or list(SOURCES),
+            chroma_path=args.chroma_path,
+            delta=args.delta,
+            workers=args.workers,
+            use_cache=not args.no_cache,
+            batch_size=args.batch_size,
+            max_batch_size=args.max_batch_size,
+            memory_limit_mb=args.memory_limit_mb
+        )
+        if args.summary:
+            with open(args.summary, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+    except Exception as e:
+        log_status(f"Fatal error: {str(e)}", important=True)
+        return 1
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+# ingest_pipeline.py
+import os
+import queue
+import resource
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import html2text
+
+# Number of processes converting HTML; 0 or 1 converts in the calling process
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', os.cpu_count() or 1))
+# Items handed to a worker per task, to amortize pickling overhead
+CHUNK_SIZE = 16
+# Batches allowed to wait for the Chroma writer before conversion blocks
+QUEUE_SIZE = 4
+
+# Adaptive batching: grow batches while embed+write stays under the target
+# latency and memory stays under the limit, shrink them otherwise
+MIN_BATCH_SIZE = 10
+MAX_BATCH_SIZE = int(os.getenv('INGEST_MAX_BATCH_SIZE', '1000'))
+TARGET_BATCH_SECONDS = float(os.getenv('INGEST_TARGET_BATCH_SECONDS', '2.0'))
+MEMORY_LIMIT_MB = int(os.getenv('INGEST_MEMORY_LIMIT_MB', '2048'))
+
+STAGES = ("parse", "convert", "embed", "write")
+
+_html_converter = None
+
+
+def html_to_text(html):
+    """Convert an HTML body to markdown-ish text with a per-process converter"""
+    global _html_converter
+    if _html_converter is None:
+        _html_converter = html2text.HTML2Text()
+        _html_converter.ignore_links = False
+    return _html_converter.handle(html or '')
+
+
+def _rusage_mb(value):
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return value / (1024 * 1024) if sys.platform == 'darwin' else value / 1024
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    return _rusage_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # No /proc (macOS): the peak is the best cheap approximation
+        return peak_rss_mb()
+
+
+class PipelineStats:
+    """Seconds and document counts accumulated per pipeline stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds = {stage: 0.0 for stage in STAGES}
+        self.docs = {stage: 0 for stage in STAGES}
+
+    def add(self, stage, seconds, docs):
+        with self._lock:
+            self.seconds[stage] += seconds
+            self.docs[stage] += docs
+
+    def merge(self, other):
+        for stage in STAGES:
+            self.add(stage, other.seconds[stage], other.docs[stage])
+
+    def rate(self, stage):
+        seconds = self.seconds[stage]
+        return self.docs[stage] / seconds if seconds > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            stage: {
+                "seconds": round(self.seconds[stage], 3),
+                "docs": self.docs[stage],
+                "docs_per_sec": round(self.rate(stage), 2)
+            }
+            for stage in STAGES
+        }
+
+    def report(self):
+        """Lines describing throughput per stage"""
+        return [
+            f"{stage:<8} {self.docs[stage]:>8} docs in {self.seconds[stage]:8.2f}s "
+            f"({self.rate(stage):.2f} docs/sec)"
+            for stage in STAGES
+        ]
+
+
+class AdaptiveBatcher:
+    """Pick the next batch size from measured embed+write latency and memory.
+
+    A full batch that finishes in under half of ``target_seconds`` doubles
+    the size (up to ``max_size``); one that overshoots the target halves it,
+    and so does resident memory above ``memory_limit_mb``.
+    """
+
+    def __init__(self, initial=MIN_BATCH_SIZE, min_size=MIN_BATCH_SIZE, max_size=MAX_BATCH_SIZE,
+                 target_seconds=TARGET_BATCH_SECONDS, memory_limit_mb=MEMORY_LIMIT_MB):
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.size = min(max(initial, min_size), self.max_size)
+        self.target_seconds = target_seconds
+        self.memory_limit_mb = memory_limit_mb
+        self.peak_size = self.size
+
+    def observe(self, batch_docs, seconds):
+        if current_rss_mb() > self.memory_limit_mb or seconds > self.target_seconds:
+            self.size = max(self.min_size, self.size // 2)
+        elif seconds < self.target_seconds / 2 and batch_docs >= self.size:
+            self.size = min(self.max_size, self.size * 2)
+        self.peak_size = max(self.peak_size, self.size)
+
+
+def _prepare_chunk(prepare, items):
+    """Run ``prepare`` over a chunk of items, capturing per-item errors.
+
+    Returns the results and the seconds spent, so conversion time can be
+    reported even when the chunk ran in another process.
+    """
+    start = time.perf_counter()
+    results = []
+    for item in items:
+        try:
+            results.append((prepare(item), None))
+        except Exception as e:
+            item_id = item.get('id', 'unknown') if isinstance(item, dict) else 'unknown'
+            results.append((None, f"{item_id}: {str(e)}"))
+    return results, time.perf_counter() - start
+
+
+def _chunks(items, size, stats):
+    """Group items into lists, timing how long the source takes to yield them"""
+    items = iter(items)
+    chunk = []
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(items)
+        except StopIteration:
+            break
+        stats.add("parse", time.perf_counter() - start, 1)
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _converted(items, prepare, workers, stats):
+    """Yield prepare() results in input order, converting in a process pool.
+
+    Only a bounded number of chunks is in flight at once so a streaming
+    reader upstream is never drained faster than the writer can keep up.
+    """
+    if workers <= 1:
+        for chunk in _chunks(items, CHUNK_SIZE, stats):
+            results, seconds = _prepare_chunk(prepare, chunk)
+            stats.add("convert", seconds, len(chunk))
+            yield from results
+        return
+
+    max_in_flight = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+
+        def next_results():
+            chunk_size, future = pending.popleft()
+            results, seconds = future.result()
+            # Summed over workers, so this is per-core conversion throughput
+            stats.add("convert", seconds, chunk_size)
+            return results
+
+        for chunk in _chunks(items, CHUNK_SIZE, stats):
+            pending.append((len(chunk), executor.submit(_prepare_chunk, prepare, chunk)))
+            if len(pending) >= max_in_flight:
+                yield from next_results()
+        while pending:
+            yield from next_results()
+
+
+class ChromaWriter(threading.Thread):
+    """Background thread draining a bounded queue of batches into a collection.
+
+    Embedding and the ``collection.add`` write happen here, so running it on
+    its own thread lets them overlap with HTML conversion. With an
+    ``embedding_cache`` the vectors are looked up (or computed and stored)
+    before the write, and Chroma is handed precomputed embeddings.
+    """
+
+    def __init__(self, collection, queue_size=QUEUE_SIZE, method='add', embedding_cache=None,
+                 stats=None, batcher=None):
+        super().__init__(daemon=True)
+        self.collection = collection
+        self.method = method
+        self.embedding_cache = embedding_cache
+        self.stats = stats if stats is not None else PipelineStats()
+        self.batcher = batcher
+        self.batches = queue.Queue(maxsize=queue_size)
+        self.error = None
+
+    def run(self):
+        while True:
+            batch = self.batches.get()
+            if batch is None:
+                return
+            if self.error is not None:
+                continue
+            try:
+                docs = len(batch['ids'])
+                start = time.perf_counter()
+                if self.embedding_cache is not None:
+                    batch['embeddings'] = self.embedding_cache.embed(batch['documents'])
+                    self.stats.add("embed", time.perf_counter() - start, docs)
+                embedded = time.perf_counter()
+                # Without a cache Chroma embeds inside this call
+                getattr(self.collection, self.method)(**batch)
+                finished = time.perf_counter()
+                self.stats.add("write", finished - embedded, docs)
+                if self.batcher is not None:
+                    self.batcher.observe(docs, finished - start)
+            except Exception as e:
+                self.error = e
+
+    def put(self, batch):
+        if self.error is not None:
+            raise self.error
+        self.batches.put(batch)
+
+    def close(self):
+        self.batches.put(None)
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+
+def run_pipeline(collection, items, prepare, batch_size=10, workers=INGEST_WORKERS,
+                 label='document', on_batch=None, log=print, method='add', accept=None,
+                 embedding_cache=None, stats=None, batcher=None):
+    """Convert items in parallel and stream them into a Chroma collection.
+
+    ``prepare`` must be a picklable top-level callable (or functools.partial
+    of one) returning ``{"id", "document", "metadata"}`` for an item, a list
+    of them (one item chunked into several records), or None to skip it.
+    ``accept(records)``, if given, runs in the calling process with the
+    records built from one item and returns the ones to write.
+    ``on_batch(count)`` is called each time a batch is queued for writing.
+    ``method`` is the collection method used to write, ``add`` or
+    ``upsert``. ``embedding_cache`` is an optional EmbeddingCache consulted
+    before embedding. Per-stage timings accumulate into ``stats``, and an
+    AdaptiveBatcher, if given, sizes batches instead of ``batch_size``.
+    Returns the number of documents written.
+    """
+    stats = stats if stats is not None else PipelineStats()
+    writer = ChromaWriter(collection, method=method, embedding_cache=embedding_cache,
+                          stats=stats, batcher=batcher)
+    writer.start()
+    count = 0
+    batch = {'documents': [], 'metadatas': [], 'ids': []}
+
+    try:
+        for record, error in _converted(items, prepare, workers, stats):
+            if error is not None:
+                log(f"Error processing {label} {error}")
+                continue
+            if record is None:
+                continue
+            records = record if isinstance(record, list) else [record]
+            if accept is not None:
+                records = accept(records)
+
+            for record in records:
+                batch['documents'].append(record['document'])
+                batch['metadatas'].append(record['metadata'])
+                batch['ids'].append(record['id'])
+            count += len(records)
+
+            if len(batch['ids']) >= (batcher.size if batcher is not None else batch_size):
+                if on_batch:
+                    on_batch(count)
+                writer.put(batch)
+                batch = {'documents': [], 'metadatas': [], 'ids': []}
+
+        if batch['ids']:
+            if on_batch:
+                on_batch(count)
+            writer.put(batch)
+    finally:
+        writer.close()
+
+    return count
@@ -0,0 +1,226 @@
+# lexical_index.py
+"""BM25 inverted index over the support_* collections.
+
+Built at the end of ingestion from the documents stored in Chroma, written
+as .npy arrays next to the Chroma directory and memory-mapped by the apps,
+so exact product terms, CIDs and menu paths ("Manage > Licenses", "NFR",
+"SUB_NextBilingDate") are found even when embedding search ranks them low.
+
+Files in the index directory:
+    terms.npy          sorted vocabulary (binary searched, never loaded whole)
+    offsets.npy        postings for terms[i] are postings[offsets[i]:offsets[i + 1]]
+    postings_docs.npy  document numbers, ascending within a term
+    postings_tf.npy    term frequency of each posting
+    doc_ids.npy        Chroma record id of each document number
+    doc_collection.npy collection index of each document number
+    doc_lengths.npy    tokens per document
+    meta.json          collections, counts and BM25 parameters
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIRNAME = "lexical_index"
+BM25_K1 = float(os.getenv('BM25_K1', '1.2'))
+BM25_B = float(os.getenv('BM25_B', '0.75'))
+# Longer tokens are base64 blobs and URL fragments, not search terms
+MAX_TOKEN_LENGTH = 40
+# Records read from Chroma per get() call while building
+BUILD_PAGE_SIZE = 1000
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9_]*")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its "
+    "my not of on or our so that the their then there these this to was we what when where "
+    "which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; underscores are kept so CIDs stay whole"""
+    return [
+        token for token in _TOKEN_RE.findall((text or '').lower())
+        if len(token) <= MAX_TOKEN_LENGTH and token not in STOPWORDS
+    ]
+
+
+def index_path_for(chroma_path: str) -> str:
+    """Index directory lives next to the Chroma directory"""
+    return os.path.join(os.path.dirname(os.path.abspath(chroma_path)), INDEX_DIRNAME)
+
+
+def _iter_documents(collection):
+    offset = 0
+    while True:
+        page = collection.get(include=['documents'], limit=BUILD_PAGE_SIZE, offset=offset)
+        if not page['ids']:
+            return
+        yield from zip(page['ids'], page['documents'])
+        offset += len(page['ids'])
+
+
+def build_index(client, collections: Dict[str, str], path: str, log=print) -> Dict:
+    """Build the index over the named collections and swap it into place.
+
+    ``collections`` maps collection key (articles, tickets, ...) to Chroma
+    collection name; missing collections are skipped. Running apps keep
+    serving the previous index until they reload.
+    """
+    start_time = time.time()
+    keys = []
+    doc_ids = []
+    doc_collection = []
+    doc_lengths = []
+    postings = {}
+
+    for key, name in collections.items():
+        try:
+            collection = client.get_collection(name)
+        except Exception:
+            log(f"Lexical index: skipping {name} (not found)")
+            continue
+        code = len(keys)
+        keys.append(key)
+        for record_id, document in _iter_documents(collection):
+            doc = len(doc_ids)
+            tokens = tokenize(document)
+            doc_ids.append(record_id)
+            doc_collection.append(code)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc, tf))
+
+    terms = sorted(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum([len(postings[term]) for term in terms], out=offsets[1:])
+    postings_docs = np.empty(offsets[-1], dtype=np.int32)
+    postings_tf = np.empty(offsets[-1], dtype=np.float32)
+    for i, term in enumerate(terms):
+        entries = np.asarray(postings.pop(term), dtype=np.int64).reshape(-1, 2)
+        postings_docs[offsets[i]:offsets[i + 1]] = entries[:, 0]
+        postings_tf[offsets[i]:offsets[i + 1]] = entries[:, 1]
+
+    meta = {
+        "collections": keys,
+        "documents": len(doc_ids),
+        "terms": len(terms),
+        "postings": int(offsets[-1]),
+        "avg_doc_length": float(np.mean(doc_lengths)) if doc_lengths else 0.0,
+        "k1": BM25_K1,
+        "b": BM25_B,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
+
+    # Write beside the live index, then swap directories
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "terms.npy"), np.array(terms, dtype=f"<U{MAX_TOKEN_LENGTH}"))
+    np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp_path, "postings_docs.npy"), postings_docs)
+    np.save(os.path.join(tmp_path, "postings_tf.npy"), postings_tf)
+    np.save(os.path.join(tmp_path, "doc_ids.npy"), np.array(doc_ids, dtype=str))
+    np.save(os.path.join(tmp_path, "doc_collection.npy"), np.array(doc_collection, dtype=np.uint8))
+    np.save(os.path.join(tmp_path, "doc_lengths.npy"), np.array(doc_lengths, dtype=np.float32))
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    old_path = f"{path}.old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+    meta["seconds"] = round(time.time() - start_time, 3)
+    log(f"Lexical index: {meta['documents']} documents, {meta['terms']} terms "
+        f"({meta['seconds']:.2f}s) at {path}")
+    return meta
+
+
+class LexicalIndex:
+    """Read-only BM25 index over memory-mapped arrays (thread safe)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode='r')
+        self.terms = load("terms.npy")
+        self.offsets = load("offsets.npy")
+        self.postings_docs = load("postings_docs.npy")
+        self.postings_tf = load("postings_tf.npy")
+        self.doc_ids = load("doc_ids.npy")
+        self.doc_collection = load("doc_collection.npy")
+        self.doc_lengths = load("doc_lengths.npy")
+        self.codes = {key: code for code, key in enumerate(self.meta["collections"])}
+        self.k1 = self.meta["k1"]
+        self.b = self.meta["b"]
+        self.avg_doc_length = self.meta["avg_doc_length"] or 1.0
+
+    @classmethod
+    def load(cls, path: str) -> Optional['LexicalIndex']:
+        """Open the index at path, or None when it has not been built"""
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            logger.warning(f"No lexical index at {path}; using vector search only")
+            return None
+        index = cls(path)
+        logger.info(f"Loaded lexical index: {index.meta['documents']} documents, {index.meta['terms']} terms")
+        return index
+
+    def __len__(self):
+        return self.meta["documents"]
+
+    def _term_slice(self, term: str) -> Optional[Tuple[int, int]]:
+        i = int(np.searchsorted(self.terms, term))
+        if i < len(self.terms) and self.terms[i] == term:
+            return int(self.offsets[i]), int(self.offsets[i + 1])
+        return None
+
+    def search(self, query: str, key: str = None, n_results: int = 10) -> List[Tuple[str, float]]:
+        """Top BM25 matches as (record id, score), best first.
+
+        With ``key`` only documents from that collection are considered.
+        """
+        code = self.codes.get(key) if key is not None else None
+        if key is not None and code is None:
+            return []
+
+        total = len(self)
+        docs, scores = [], []
+        for term in set(tokenize(query)):
+            span = self._term_slice(term)
+            if span is None:
+                continue
+            term_docs = np.asarray(self.postings_docs[span[0]:span[1]])
+            tf = np.asarray(self.postings_tf[span[0]:span[1]])
+            if code is not None:
+                keep = self.doc_collection[term_docs] == code
+                term_docs, tf = term_docs[keep], tf[keep]
+            if not len(term_docs):
+                continue
+            df = span[1] - span[0]
+            idf = np.log(1.0 + (total - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[term_docs] / self.avg_doc_length)
+            docs.append(term_docs)
+            scores.append(idf * tf * (self.k1 + 1.0) / (tf + norm))
+
+        if not docs:
+            return []
+        unique, inverse = np.unique(np.concatenate(docs), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(scores))
+        if len(totals) > n_results:
+            top = np.argpartition(-totals, n_results - 1)[:n_results]
+        else:
+            top = np.arange(len(totals))
+        top = top[np.argsort(-totals[top], kind='stable')]
+        return [(str(self.doc_ids[unique[i]]), float(totals[i])) for i in top]
@@ -0,0 +1,247 @@
+# metrics.py
+"""Prometheus text-format metrics, kept in process.
+
+A small Counter/Histogram implementation (no prometheus_client dependency)
+plus the service's metrics, rendered by app.py at /metrics. Each gunicorn
+worker keeps its own values, so a scrape reflects the worker that
+answered it; scrape per worker or aggregate with sum() by instance.
+"""
+import math
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+# Seconds; answer latency is dominated by the Claude call
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    labels = list(labels)
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [per-bucket counts, sum, count]
+        self._values = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self):
+        with self._lock:
+            values = sorted((key, [list(state[0]), state[1], state[2]]) for key, state in self._values.items())
+        lines = []
+        for key, (bucket_counts, total, count) in values:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUESTS = REGISTRY.counter(
+    "support_requests_total", "Answer requests by endpoint and HTTP status", ("endpoint", "status")
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "support_answer_stage_seconds",
+    "Time spent in each stage of answering a question (retrieve_<collection> per collection query)",
+    ("stage",)
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "support_answer_cache_lookups_total", "Answer cache lookups by outcome (exact, similar, miss)", ("result",)
+)
+TOKENS = REGISTRY.counter(
+    "support_claude_tokens_total", "Estimated Claude prompt (in) and completion (out) tokens", ("direction",)
+)
+COALESCED = REGISTRY.counter(
+    "support_answer_coalesced_total",
+    "Answer calls that shared the result of an identical question already in flight"
+)
+LLM_IN_FLIGHT = REGISTRY.gauge(
+    "support_llm_calls_in_flight", "Claude calls holding an admission slot, per controller (thread, async)",
+    ("controller",)
+)
+LLM_QUEUE_DEPTH = REGISTRY.gauge(
+    "support_llm_queue_depth", "Requests waiting for an admission slot, per controller (thread, async)",
+    ("controller",)
+)
+LLM_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "support_llm_queue_wait_seconds", "Time requests waited for an admission slot, admitted or not"
+)
+LLM_REJECTED = REGISTRY.counter(
+    "support_llm_rejected_total", "Requests shed by admission control (queue_full, timeout)", ("reason",)
+)
+DEADLINE_EXCEEDED = REGISTRY.counter(
+    "support_deadline_exceeded_total",
+    "Stages cut short by the request deadline (retrieve_<collection>, queue, generate, coalesced)",
+    ("stage",)
+)
+RETRIEVED_DOCUMENTS = REGISTRY.histogram(
+    "support_retrieved_documents",
+    "References retrieved per question, by collection, before context packing",
+    ("collection",),
+    buckets=COUNT_BUCKETS
+)
+PACKED_DOCUMENTS = REGISTRY.histogram(
+    "support_packed_documents", "References sent to Claude per question", buckets=COUNT_BUCKETS
+)
+
+
+def observe_timings(timings: Dict[str, float]):
+    """Record a RequestTimings.as_dict() (milliseconds) in the stage histogram"""
+    for stage, milliseconds in timings.items():
+        STAGE_SECONDS.observe(milliseconds / 1000.0, stage=stage)
+
+
+def observe_references(retrieved: List[Dict], packed: List[Dict]):
+    counts = {}
+    for ref in retrieved:
+        counts[ref['collection']] = counts.get(ref['collection'], 0) + 1
+    for collection, count in counts.items():
+        RETRIEVED_DOCUMENTS.observe(count, collection=collection)
+    PACKED_DOCUMENTS.observe(len(packed))
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """Server-Timing header value for milliseconds per stage"""
+    return ", ".join(f"{stage};dur={milliseconds:.2f}" for stage, milliseconds in timings.items())
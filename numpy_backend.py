@@ -0,0 +1,233 @@
+# numpy_backend.py
+"""In-process vector search over every support_* collection at once.
+
+All embeddings are L2-normalized into one contiguous float32 matrix with a
+collection code per row. A batch of questions is scored against the whole
+corpus with a single matrix multiply, and each collection's top k is taken
+from its rows of the score matrix with argpartition, with no Chroma client
+or SQLite round trip per query.
+
+Selected with RETRIEVAL_BACKEND=numpy (see support.py). The matrix is read
+from the snapshot at SNAPSHOT_PATH when set (see snapshot.py), otherwise
+from Chroma at startup; it is a static copy, so restart (or re-export the
+snapshot) after ingesting. Snapshot rows are stored unit length, so the
+memory-mapped matrix is searched in place rather than copied. Distances
+follow each collection's hnsw:space: 2 - 2 * cosine (squared L2 between
+unit vectors) for l2, 1 - cosine for cosine and ip. Each equals Chroma's
+distance for the unit-length embeddings our model produces, so
+``relevance`` keeps its meaning.
+"""
+import logging
+import time
+from collections.abc import Mapping
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from retrieval import COLLECTIONS, distance_space, to_reference
+
+logger = logging.getLogger(__name__)
+
+LOAD_PAGE_SIZE = 1000
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class _Records:
+    """Ids, documents and metadata held in memory (the Chroma-loaded case)"""
+
+    def __init__(self, ids: List[str], documents: List[str], metadatas: List[Dict]):
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+
+    def document(self, row: int) -> str:
+        return self.documents[row]
+
+    def metadata(self, row: int) -> Dict:
+        return self.metadatas[row]
+
+
+class NumpyBackend(Mapping):
+    """Collection key -> Chroma-compatible collection view, plus batched search.
+
+    Read-only after construction, so it is safe to share across threads and
+    to build in a preforking server's master.
+    """
+
+    def __init__(self, matrix: np.ndarray, codes: np.ndarray, keys: List[str], names: List[str], records,
+                 spaces: Optional[List[str]] = None, normalized: bool = False):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        # Rows that are already unit length (a snapshot's mmap) are used without a copy
+        self.matrix = np.ascontiguousarray(matrix if normalized else _normalize(matrix))
+        self.codes = codes
+        self.records = records
+        # Row numbers of each collection: the collection mask, precomputed
+        self.rows = {key: np.flatnonzero(codes == code) for code, key in enumerate(keys)}
+        self.spaces = dict(zip(keys, spaces or ['l2'] * len(keys)))
+        self.row_by_id = {str(record_id): row for row, record_id in enumerate(records.ids)}
+        self.collections = {
+            key: NumpyCollection(self, key, code, name) for code, (key, name) in enumerate(zip(keys, names))
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> 'NumpyBackend':
+        """Build from a snapshot.Snapshot; documents and metadata stay memory-mapped"""
+        entries = snapshot.manifest["collections"]
+        codes = np.zeros(len(snapshot), dtype=np.uint8)
+        for code, entry in enumerate(entries):
+            codes[entry["start"]:entry["end"]] = code
+        return cls(
+            snapshot.embeddings, codes, [e["key"] for e in entries], [e["name"] for e in entries], snapshot,
+            spaces=[distance_space(e["metadata"]) for e in entries],
+            normalized=snapshot.manifest.get("normalized", False)
+        )
+
+    @classmethod
+    def from_chroma(cls, client, collections: Dict[str, str] = COLLECTIONS) -> 'NumpyBackend':
+        """Read every record and embedding out of the named Chroma collections"""
+        start_time = time.time()
+        keys, names, spaces, codes, ids, documents, metadatas, vectors = [], [], [], [], [], [], [], []
+        for key, name in collections.items():
+            try:
+                collection = client.get_collection(name)
+            except Exception:
+                logger.warning(f"NumPy backend: collection {name} not found")
+                continue
+            code = len(keys)
+            keys.append(key)
+            names.append(name)
+            spaces.append(distance_space(collection.metadata))
+            offset = 0
+            while True:
+                page = collection.get(
+                    include=['documents', 'metadatas', 'embeddings'], limit=LOAD_PAGE_SIZE, offset=offset
+                )
+                if not len(page['ids']):
+                    break
+                ids.extend(page['ids'])
+                documents.extend(page['documents'])
+                metadatas.extend(page['metadatas'])
+                vectors.append(np.asarray(page['embeddings'], dtype=np.float32))
+                codes.extend([code] * len(page['ids']))
+                offset += len(page['ids'])
+        matrix = np.concatenate(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        backend = cls(
+            matrix, np.array(codes, dtype=np.uint8), keys, names, _Records(ids, documents, metadatas), spaces=spaces
+        )
+        logger.info(f"NumPy backend: loaded {len(ids)} records from Chroma in {time.time() - start_time:.2f}s")
+        return backend
+
+    def __getitem__(self, key):
+        return self.collections[key]
+
+    def __iter__(self):
+        return iter(self.collections)
+
+    def __len__(self):
+        return len(self.collections)
+
+    def get_rows(self, rows, include) -> Dict:
+        """Chroma-style column dict for the given rows"""
+        result = {'ids': [str(self.records.ids[row]) for row in rows]}
+        if 'documents' in include:
+            result['documents'] = [self.records.document(row) for row in rows]
+        if 'metadatas' in include:
+            result['metadatas'] = [self.records.metadata(row) for row in rows]
+        if 'embeddings' in include:
+            result['embeddings'] = self.matrix[list(rows)] if len(rows) else []
+        return result
+
+    def top_k(self, query_embeddings, n_results: Dict[str, int]) -> List[Dict[str, List]]:
+        """Nearest rows per collection for a batch of queries.
+
+        Returns, per query, {key: [(row, distance), ...]} best first, for
+        each key in ``n_results`` with a positive count.
+        """
+        queries = _normalize(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)))
+        results = [{} for _ in range(len(queries))]
+        if not len(self.matrix):
+            return results
+        # One multiply for every query against every collection
+        similarities = queries @ self.matrix.T
+        for key, k in n_results.items():
+            rows = self.rows.get(key)
+            if rows is None or k <= 0:
+                continue
+            k = min(k, len(rows))
+            scores = similarities[:, rows]
+            if k < len(rows):
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(len(rows)), scores.shape)
+            order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+            similarity = np.take_along_axis(scores, top, axis=1)
+            if self.spaces[key] == 'l2':
+                distances = np.maximum(0.0, 2.0 - 2.0 * similarity)
+            else:
+                distances = 1.0 - similarity
+            for i in range(len(queries)):
+                results[i][key] = list(zip(rows[top[i]].tolist(), distances[i].tolist()))
+        return results
+
+    def search(self, query_embeddings, n_results: Dict[str, int]) -> List[Dict[str, List[Dict]]]:
+        """top_k as references (retrieval.to_reference), per query and collection"""
+        hits = []
+        for query_hits in self.top_k(query_embeddings, n_results):
+            references = {}
+            for key, ranked in query_hits.items():
+                found = self.get_rows([row for row, _ in ranked], ['documents', 'metadatas'])
+                references[key] = [
+                    to_reference(key, record_id, document, metadata, distance)
+                    for record_id, document, metadata, (_, distance) in zip(
+                        found['ids'], found['documents'], found['metadatas'], ranked
+                    )
+                ]
+            hits.append(references)
+        return hits
+
+
+class NumpyCollection:
+    """The part of Chroma's Collection API the apps use, over one collection's rows"""
+
+    def __init__(self, backend: NumpyBackend, key: str, code: int, name: str):
+        self.backend = backend
+        self.key = key
+        self.code = code
+        self.name = name
+        # Read by retrieval.fuse_hits to score lexical-only hits like the vector ones
+        self.metadata = {'hnsw:space': backend.spaces[key]}
+
+    def count(self) -> int:
+        return len(self.backend.rows[self.key])
+
+    def get(self, ids: Optional[List[str]] = None, limit: Optional[int] = None, offset: Optional[int] = None,
+            include=('documents', 'metadatas')) -> Dict:
+        if ids is not None:
+            found = [self.backend.row_by_id.get(record_id) for record_id in ids]
+            selected = [row for row in found if row is not None and self.backend.codes[row] == self.code]
+        else:
+            start = offset or 0
+            selected = self.backend.rows[self.key][start:None if limit is None else start + limit].tolist()
+        return self.backend.get_rows(selected, include)
+
+    def query(self, query_embeddings, n_results: int = 10,
+              include=('documents', 'metadatas', 'distances')) -> Dict:
+        results = {'ids': [], 'distances': []}
+        for column in ('documents', 'metadatas'):
+            if column in include:
+                results[column] = []
+        for query_hits in self.backend.top_k(query_embeddings, {self.key: n_results}):
+            ranked = query_hits.get(self.key, [])
+            found = self.backend.get_rows([row for row, _ in ranked], include)
+            for column in results:
+                if column == 'distances':
+                    results['distances'].append([distance for _, distance in ranked])
+                else:
+                    results[column].append(found[column])
+        return results
@@ -0,0 +1,32 @@
+# request_timings.py
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class RequestTimings:
+    """Wall-clock milliseconds spent in each stage of answering one request.
+
+    A stage timed more than once (cache lookups before and after embedding)
+    accumulates.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def record(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def as_dict(self) -> Dict[str, float]:
+        timings = {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()}
+        timings['total'] = round((time.perf_counter() - self.started) * 1000, 2)
+        return timings
@@ -0,0 +1,398 @@
+# retrieval.py
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import DEADLINE_EXCEEDED
+
+logger = logging.getLogger(__name__)
+
+# Collection key -> ChromaDB collection name
+COLLECTIONS = {
+    'articles': 'support_articles',
+    'tickets': 'support_tickets',
+    'internal': 'support_internal',
+    'drafts': 'support_drafts'
+}
+
+# Most references each collection may contribute to an answer
+DEFAULT_QUOTAS = {
+    'articles': int(os.getenv('QUOTA_ARTICLES', '3')),
+    'tickets': int(os.getenv('QUOTA_TICKETS', '2')),
+    'internal': int(os.getenv('QUOTA_INTERNAL', '2')),
+    'drafts': int(os.getenv('QUOTA_DRAFTS', '1'))
+}
+
+# Query embeddings sent to Chroma per collection.query call in batch mode
+QUERY_BATCH_SIZE = int(os.getenv('QUERY_BATCH_SIZE', '256'))
+
+# Reciprocal rank fusion constant, and candidates taken from each retriever
+RRF_K = int(os.getenv('RRF_K', '60'))
+HYBRID_CANDIDATES = int(os.getenv('HYBRID_CANDIDATES', '20'))
+
+# Shared by all requests; one slot per collection query in flight
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('RETRIEVAL_THREADS', str(len(COLLECTIONS) * 4))),
+    thread_name_prefix='retrieval'
+)
+
+
+def preload_collections(collections: Dict):
+    """Read one vector from each collection so its index is loaded into memory"""
+    for collection in collections.values():
+        collection.get(limit=1, include=['embeddings'])
+
+
+def release_connections(client):
+    """Close a persistent Chroma client's SQLite connections.
+
+    Called in a preforking server's master after preloading: SQLite handles
+    must not be shared across fork, and each worker reconnects on first use.
+    """
+    from chromadb.db.impl.sqlite import SqliteDB
+
+    client._system.instance(SqliteDB)._conn_pool.close()
+
+
+def document_version(document: str, metadata: Dict) -> str:
+    """Version of a stored record: the ingestion content hash, else a hash of its text"""
+    version = (metadata or {}).get('content_hash')
+    if version:
+        return version
+    return hashlib.sha256((document or '').encode('utf-8')).hexdigest()
+
+
+def distance_space(metadata: Optional[Dict]) -> str:
+    """A collection's distance function (hnsw:space), Chroma's default l2 if unset"""
+    space = (metadata or {}).get('hnsw:space', 'l2')
+    if space not in ('l2', 'cosine', 'ip'):
+        raise ValueError(f"Unsupported hnsw:space {space!r}")
+    return space
+
+
+def embedding_distances(space: str, embeddings, query_embedding: List[float]) -> np.ndarray:
+    """Chroma's distance from the query to each embedding in an hnsw:space"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    if space == 'ip':
+        return 1.0 - embeddings @ query
+    if space == 'cosine':
+        norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query)
+        return 1.0 - (embeddings @ query) / np.where(norms == 0, 1.0, norms)
+    return np.sum((embeddings - query) ** 2, axis=1)
+
+
+def to_reference(key: str, record_id: str, document: str, metadata: Dict, distance: float) -> Dict:
+    """Normalize a Chroma hit into the reference shape the endpoints return"""
+    metadata = metadata or {}
+    return {
+        'id': metadata.get('id', record_id),
+        'record_id': record_id,
+        'type': metadata.get('type', key),
+        'collection': key,
+        'title': metadata.get('title') or metadata.get('subject', 'No Title'),
+        'url': metadata.get('url', ''),
+        'section': metadata.get('section', ''),
+        'relevance': round(1.0 / (1.0 + distance), 4),
+        'content': document or '',
+        'version': document_version(document, metadata)
+    }
+
+
+def query_collection(key: str, collection, query_embeddings: List[List[float]], n_results: int) -> List[List[Dict]]:
+    """Query one collection with precomputed embeddings; one hit list per embedding"""
+    results = collection.query(
+        query_embeddings=query_embeddings,
+        n_results=n_results,
+        include=['documents', 'metadatas', 'distances']
+    )
+    return [
+        [
+            to_reference(key, record_id, document, metadata, distance)
+            for record_id, document, metadata, distance in zip(
+                results['ids'][i],
+                results['documents'][i],
+                results['metadatas'][i],
+                results['distances'][i]
+            )
+        ]
+        for i in range(len(query_embeddings))
+    ]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> Dict[str, float]:
+    """Fuse ranked id lists: each id scores the sum of 1 / (k + rank)"""
+    scores = {}
+    for ranking in rankings:
+        for rank, record_id in enumerate(ranking, 1):
+            scores[record_id] = scores.get(record_id, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+def fuse_hits(key: str, collection, vector_hits: List[Dict], lexical_hits: List[Tuple[str, float]],
+              query_embedding: List[float], n_results: int) -> List[Dict]:
+    """Merge one collection's vector and BM25 hits by reciprocal rank fusion.
+
+    Records only the lexical retriever found are read back from Chroma and
+    given the distance Chroma would report in the collection's hnsw:space,
+    so ``relevance`` means the same for every reference. The fused score is
+    returned as ``score``.
+    """
+    scores = reciprocal_rank_fusion([
+        [ref['record_id'] for ref in vector_hits],
+        [record_id for record_id, _ in lexical_hits]
+    ])
+    refs = {ref['record_id']: ref for ref in vector_hits}
+    missing = [record_id for record_id, _ in lexical_hits if record_id not in refs]
+    if missing:
+        found = collection.get(ids=missing, include=['documents', 'metadatas', 'embeddings'])
+        if len(found['ids']):
+            distances = embedding_distances(
+                distance_space(collection.metadata), found['embeddings'], query_embedding
+            )
+            for record_id, document, metadata, distance in zip(
+                found['ids'], found['documents'], found['metadatas'], distances
+            ):
+                refs[record_id] = to_reference(key, record_id, document, metadata, float(distance))
+
+    fused = []
+    for record_id in sorted(refs, key=lambda record_id: scores[record_id], reverse=True)[:n_results]:
+        ref = refs[record_id]
+        ref['score'] = round(scores[record_id], 6)
+        fused.append(ref)
+    return fused
+
+
+def hybrid_query_collection(key: str, collection, query_embeddings: List[List[float]], questions: List[str],
+                            n_results: int, lexical_index) -> List[List[Dict]]:
+    """query_collection plus BM25 over the same collection, fused per question"""
+    candidates = max(n_results, HYBRID_CANDIDATES)
+    vector_hits = query_collection(key, collection, query_embeddings, candidates)
+    return [
+        fuse_hits(key, collection, hits, lexical_index.search(question, key, candidates), embedding, n_results)
+        for hits, embedding, question in zip(vector_hits, query_embeddings, questions)
+    ]
+
+
+def _query(key: str, collection, query_embeddings: List[List[float]], questions: Optional[List[str]],
+           n_results: int, lexical_index=None) -> List[List[Dict]]:
+    if lexical_index is not None and questions is not None:
+        return hybrid_query_collection(key, collection, query_embeddings, questions, n_results, lexical_index)
+    return query_collection(key, collection, query_embeddings, n_results)
+
+
+def search_backend(backend, query_embeddings: List[List[float]], questions: Optional[List[str]],
+                   quotas: Dict[str, int], lexical_index=None) -> List[Dict[str, List[Dict]]]:
+    """Hits per question and collection from a backend that searches every
+    collection in one pass (numpy_backend.NumpyBackend), fused with BM25
+    hits like _query when a lexical index and questions are given.
+    """
+    hybrid = lexical_index is not None and questions is not None
+    n_results = {
+        key: max(quota, HYBRID_CANDIDATES) if hybrid else quota
+        for key, quota in quotas.items() if quota > 0 and key in backend
+    }
+    hits = backend.search(query_embeddings, n_results)
+    if hybrid:
+        for question_hits, embedding, question in zip(hits, query_embeddings, questions):
+            for key, vector_hits in question_hits.items():
+                lexical_hits = lexical_index.search(question, key, n_results[key])
+                question_hits[key] = fuse_hits(key, backend[key], vector_hits, lexical_hits, embedding, quotas[key])
+    return hits
+
+
+def _searches_all(collections) -> bool:
+    # Backends with search() handle every collection in one call; plain
+    # dicts of Chroma collections are queried one collection at a time
+    return hasattr(collections, 'search')
+
+
+def _timed_query(*args) -> Tuple[List[List[Dict]], float]:
+    start = time.perf_counter()
+    return _query(*args), time.perf_counter() - start
+
+
+def _rank(ref: Dict) -> float:
+    # Fused scores when hybrid retrieval ran, vector relevance otherwise
+    return ref.get('score', ref['relevance'])
+
+
+def merge_results(hits_by_collection: Dict[str, List[Dict]], quotas: Dict[str, int] = None) -> List[Dict]:
+    """Take each collection's best hits up to its quota and rank them together"""
+    quotas = quotas or DEFAULT_QUOTAS
+    merged = []
+    for key, hits in hits_by_collection.items():
+        ranked = sorted(hits, key=_rank, reverse=True)
+        merged.extend(ranked[:quotas.get(key, 0)])
+    return sorted(merged, key=_rank, reverse=True)
+
+
+def fan_out_query(collections: Dict, query_embedding: List[float], quotas: Dict[str, int] = None,
+                  question: str = None, lexical_index=None, timings=None, timeout: float = None,
+                  timed_out: List[str] = None) -> List[Dict]:
+    """Query every collection concurrently with one shared query embedding.
+
+    Latency is that of the slowest collection rather than the sum. A
+    collection that fails is logged and left out of the merged results.
+    With a question and a LexicalIndex, each collection's vector hits are
+    fused with its BM25 hits. ``collections`` may instead be a backend that
+    searches them all in one pass (see search_backend). Each collection
+    query's duration is recorded as retrieve_<key> in ``timings`` (a
+    RequestTimings) when given.
+
+    Collections that have not answered within ``timeout`` seconds are left
+    out too and their keys appended to ``timed_out``. Their queries are
+    cancelled if still waiting for a thread; one already running finishes
+    in the background, as Chroma queries cannot be interrupted.
+    """
+    quotas = quotas or DEFAULT_QUOTAS
+    questions = [question] if question is not None else None
+    if _searches_all(collections):
+        try:
+            hits = search_backend(collections, [query_embedding], questions, quotas, lexical_index)
+        except Exception as e:
+            logger.error(f"Query against the retrieval backend failed: {e}")
+            return []
+        return merge_results(hits[0], quotas)
+
+    futures = {
+        key: _executor.submit(
+            _timed_query, key, collection, [query_embedding], questions, quotas.get(key, 0), lexical_index
+        )
+        for key, collection in collections.items()
+        if quotas.get(key, 0) > 0
+    }
+
+    done, _ = wait(futures.values(), timeout=timeout)
+    hits_by_collection = {}
+    for key, future in futures.items():
+        if future not in done:
+            _missed_deadline(key, timeout, future.cancel, timed_out)
+            continue
+        try:
+            hits, seconds = future.result()
+            hits_by_collection[key] = hits[0]
+            if timings is not None:
+                timings.record(f'retrieve_{key}', seconds)
+        except Exception as e:
+            logger.error(f"Query against {COLLECTIONS.get(key, key)} failed: {e}")
+    return merge_results(hits_by_collection, quotas)
+
+
+def _missed_deadline(key: str, timeout: float, cancel, timed_out: Optional[List[str]]):
+    cancel()
+    logger.warning(f"Query against {COLLECTIONS.get(key, key)} missed its {timeout:.2f}s deadline")
+    DEADLINE_EXCEEDED.inc(stage=f'retrieve_{key}')
+    if timed_out is not None:
+        timed_out.append(key)
+
+
+def batch_fan_out_query(collections: Dict, query_embeddings: List[List[float]],
+                        quotas: Dict[str, int] = None, questions: List[str] = None,
+                        lexical_index=None, timeout: float = None,
+                        timed_out: List[str] = None) -> List[List[Dict]]:
+    """fan_out_query for many questions at once.
+
+    Each collection is queried with the embeddings in chunks of
+    QUERY_BATCH_SIZE, all chunks concurrently, and the hits are merged per
+    question. Returns one reference list per query embedding, in order.
+    A collection with any chunk unanswered after ``timeout`` seconds is left
+    out for every question, as in fan_out_query.
+    """
+    quotas = quotas or DEFAULT_QUOTAS
+    if _searches_all(collections):
+        results = []
+        for start in range(0, len(query_embeddings), QUERY_BATCH_SIZE):
+            chunk = query_embeddings[start:start + QUERY_BATCH_SIZE]
+            chunk_questions = questions[start:start + QUERY_BATCH_SIZE] if questions is not None else None
+            try:
+                hits = search_backend(collections, chunk, chunk_questions, quotas, lexical_index)
+            except Exception as e:
+                logger.error(f"Batch query against the retrieval backend failed: {e}")
+                hits = [{} for _ in chunk]
+            results.extend(merge_results(hits_by_collection, quotas) for hits_by_collection in hits)
+        return results
+
+    futures = []
+    for key, collection in collections.items():
+        if quotas.get(key, 0) <= 0:
+            continue
+        for start in range(0, len(query_embeddings), QUERY_BATCH_SIZE):
+            chunk = query_embeddings[start:start + QUERY_BATCH_SIZE]
+            chunk_questions = questions[start:start + QUERY_BATCH_SIZE] if questions is not None else None
+            futures.append((key, start, _executor.submit(
+                _query, key, collection, chunk, chunk_questions, quotas[key], lexical_index
+            )))
+
+    done, _ = wait([future for _, _, future in futures], timeout=timeout)
+    late = {key for key, _, future in futures if future not in done}
+    for key in sorted(late):
+        pending = [future for k, _, future in futures if k == key and future not in done]
+        _missed_deadline(key, timeout, lambda: [future.cancel() for future in pending], timed_out)
+
+    hits = [{} for _ in query_embeddings]
+    for key, start, future in futures:
+        if key in late:
+            continue
+        try:
+            for offset, collection_hits in enumerate(future.result()):
+                hits[start + offset][key] = collection_hits
+        except Exception as e:
+            logger.error(f"Batch query against {COLLECTIONS.get(key, key)} failed: {e}")
+    return [merge_results(hits_by_collection, quotas) for hits_by_collection in hits]
+
+
+async def fan_out_query_async(collections: Dict, query_embedding: List[float],
+                              quotas: Dict[str, int] = None, question: str = None,
+                              lexical_index=None, timings=None, timeout: float = None,
+                              timed_out: List[str] = None) -> List[Dict]:
+    """Async fan_out_query: collection queries run on the retrieval thread pool
+    while the event loop stays free for other requests.
+    """
+    quotas = quotas or DEFAULT_QUOTAS
+    loop = asyncio.get_running_loop()
+    keys = [key for key in collections if quotas.get(key, 0) > 0]
+    questions = [question] if question is not None else None
+    if _searches_all(collections):
+        try:
+            hits = await loop.run_in_executor(
+                _executor, search_backend, collections, [query_embedding], questions, quotas, lexical_index
+            )
+        except Exception as e:
+            logger.error(f"Query against the retrieval backend failed: {e}")
+            return []
+        return merge_results(hits[0], quotas)
+    futures = {
+        key: loop.run_in_executor(
+            _executor, _timed_query, key, collections[key], [query_embedding], questions, quotas[key],
+            lexical_index
+        )
+        for key in keys
+    }
+    if futures:
+        await asyncio.wait(futures.values(), timeout=timeout)
+
+    hits_by_collection = {}
+    for key, future in futures.items():
+        if not future.done():
+            _missed_deadline(key, timeout, future.cancel, timed_out)
+            continue
+        if future.exception() is not None:
+            logger.error(f"Query against {COLLECTIONS.get(key, key)} failed: {future.exception()}")
+            continue
+        hits, seconds = future.result()
+        hits_by_collection[key] = hits[0]
+        if timings is not None:
+            timings.record(f'retrieve_{key}', seconds)
+    return merge_results(hits_by_collection, quotas)
+
+
+def public_reference(ref: Dict) -> Dict:
+    """Reference fields returned to API clients (no document body)"""
+    return {k: v for k, v in ref.items() if k not in ('content', 'record_id', 'version', 'tokens')}
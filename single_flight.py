@@ -0,0 +1,84 @@
+# single_flight.py
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run one computation per key at a time and share it with concurrent callers.
+
+    The first caller for a key computes; callers arriving while it runs wait
+    and receive the same result (or exception). Nothing is kept once the
+    computation finishes; that is the answer cache's job. Threads use
+    ``do``, coroutines ``do_async``; the two do not share flights.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T], timeout: Optional[float] = None) -> Tuple[T, bool]:
+        """Returns fn's result and whether it came from another caller's call.
+
+        A caller waiting on another's call gives up with TimeoutError after
+        ``timeout`` seconds; the call itself carries on.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"Identical call still running after {timeout:.2f}s")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[T]],
+                       timeout: Optional[float] = None) -> Tuple[T, bool]:
+        """Coroutine version of ``do``.
+
+        The computation runs as its own task, so a caller that is cancelled
+        (client disconnected) does not cancel it for the others.
+        """
+        task = self._tasks.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        if not shared or timeout is None:
+            return await asyncio.shield(task), shared
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout), shared
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Identical call still running after {timeout:.2f}s") from None
+
+    def _finished(self, key: Hashable, task: asyncio.Future):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the exception retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,333 @@
+# snapshot.py
+"""Read-only, memory-mapped snapshot of the support_* collections.
+
+A snapshot directory holds every collection's records back to back:
+
+    manifest.json          format version, dimension and each collection's row range
+    embeddings.npy         float32 matrix of L2-normalized embeddings, one row per record
+    norms.npy              L2 norm of each original embedding
+    ids.npy                record ids
+    documents.bin          UTF-8 documents, row i is documents[offsets[i]:offsets[i + 1]]
+    document_offsets.npy
+    metadatas.bin          JSON metadata per row, indexed the same way
+    metadata_offsets.npy
+
+Apps started with SNAPSHOT_PATH serve from it instead of opening Chroma:
+every file is memory-mapped, so boot does no hydration and workers share
+the pages. Rows are stored unit length so the NumPy backend can search the
+mapped matrix as is; the norms give back the original embeddings and exact
+distances in each collection's hnsw:space. Usage:
+
+    python snapshot.py export [--chroma-path src/data/chroma_db] [--out DIR]
+    python snapshot.py import --snapshot DIR [--chroma-path DIR]
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import shutil
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from retrieval import COLLECTIONS, distance_space
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+SNAPSHOT_DIRNAME = "index_snapshot"
+PAGE_SIZE = 1000
+
+
+def snapshot_path_for(chroma_path: str) -> str:
+    """Default snapshot directory, next to the Chroma directory"""
+    return os.path.join(os.path.dirname(os.path.abspath(chroma_path)), SNAPSHOT_DIRNAME)
+
+
+def _pages(collection, include):
+    offset = 0
+    while True:
+        page = collection.get(include=include, limit=PAGE_SIZE, offset=offset)
+        if not len(page['ids']):
+            return
+        yield page
+        offset += len(page['ids'])
+
+
+def export_snapshot(client, path: str, collections: Dict[str, str] = COLLECTIONS, log=print) -> Dict:
+    """Write the named collections (key -> Chroma name) to a snapshot at ``path``"""
+    start_time = time.time()
+    sources = {}
+    for key, name in collections.items():
+        try:
+            sources[key] = client.get_collection(name)
+        except Exception:
+            log(f"Snapshot: skipping {name} (not found)")
+    # Rows are preallocated from these counts; records added during the export are left out
+    limits = {key: collection.count() for key, collection in sources.items()}
+    total = sum(limits.values())
+
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    embeddings = None
+    norms = []
+    ids = []
+    document_offsets = [0]
+    metadata_offsets = [0]
+    entries = []
+    row = 0
+    with open(os.path.join(tmp_path, "documents.bin"), "wb") as documents_file, \
+            open(os.path.join(tmp_path, "metadatas.bin"), "wb") as metadatas_file:
+        for key, collection in sources.items():
+            start = row
+            for page in _pages(collection, ['documents', 'metadatas', 'embeddings']):
+                room = limits[key] - (row - start)
+                if room <= 0:
+                    break
+                page = {column: page[column][:room] for column in ('ids', 'embeddings', 'documents', 'metadatas')}
+                vectors = np.asarray(page['embeddings'], dtype=np.float32)
+                if embeddings is None:
+                    embeddings = np.lib.format.open_memmap(
+                        os.path.join(tmp_path, "embeddings.npy"), mode='w+',
+                        dtype=np.float32, shape=(total, vectors.shape[1])
+                    )
+                vector_norms = np.linalg.norm(vectors, axis=1)
+                embeddings[row:row + len(vectors)] = vectors / np.where(vector_norms == 0, 1.0, vector_norms)[:, None]
+                norms.append(vector_norms)
+                row += len(vectors)
+                ids.extend(page['ids'])
+                for document, metadata in zip(page['documents'], page['metadatas']):
+                    document_offsets.append(document_offsets[-1] + documents_file.write((document or '').encode('utf-8')))
+                    metadata_offsets.append(metadata_offsets[-1] + metadatas_file.write(
+                        json.dumps(metadata or {}, separators=(',', ':')).encode('utf-8')
+                    ))
+            entries.append({
+                "key": key,
+                "name": collection.name,
+                "metadata": collection.metadata,
+                "start": start,
+                "end": row
+            })
+            log(f"Snapshot: {collection.name} {row - start} records")
+            skipped = collection.count() - (row - start)
+            if skipped > 0:
+                log(f"Snapshot: {collection.name} grew during the export; {skipped} new records left out")
+
+    if embeddings is None:
+        embeddings = np.zeros((0, 0), dtype=np.float32)
+        np.save(os.path.join(tmp_path, "embeddings.npy"), embeddings)
+    else:
+        embeddings.flush()
+        if row < total:
+            # Collections shrank while exporting; drop the unwritten rows from the file
+            truncated_path = os.path.join(tmp_path, "embeddings.truncated.npy")
+            np.save(truncated_path, embeddings[:row])
+            del embeddings
+            os.replace(truncated_path, os.path.join(tmp_path, "embeddings.npy"))
+    embeddings = np.load(os.path.join(tmp_path, "embeddings.npy"), mmap_mode='r')
+    norms = np.concatenate(norms) if norms else np.zeros(0)
+    np.save(os.path.join(tmp_path, "norms.npy"), norms.astype(np.float32))
+    np.save(os.path.join(tmp_path, "ids.npy"), np.array(ids, dtype=str))
+    np.save(os.path.join(tmp_path, "document_offsets.npy"), np.array(document_offsets, dtype=np.int64))
+    np.save(os.path.join(tmp_path, "metadata_offsets.npy"), np.array(metadata_offsets, dtype=np.int64))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "count": row,
+        "dimension": int(embeddings.shape[1]) if row else 0,
+        "normalized": True,
+        "collections": entries
+    }
+    with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    del embeddings
+
+    old_path = f"{path}.old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+    log(f"Snapshot: {row} records, dimension {manifest['dimension']} "
+        f"({time.time() - start_time:.2f}s) at {path}")
+    return manifest
+
+
+def import_snapshot(snapshot: 'Snapshot', client, log=print):
+    """Recreate the snapshot's collections in a Chroma client, embeddings verbatim"""
+    for key, collection in snapshot.collections.items():
+        try:
+            client.delete_collection(collection.name)
+        except Exception:
+            pass
+        target = client.create_collection(collection.name, metadata=collection.metadata)
+        for offset in range(0, collection.count(), PAGE_SIZE):
+            page = collection.get(limit=PAGE_SIZE, offset=offset,
+                                  include=['documents', 'metadatas', 'embeddings'])
+            target.add(**page)
+        log(f"Imported {target.count()} records into {collection.name}")
+
+
+def _map_file(path: str):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class Snapshot:
+    """A snapshot directory opened read-only; arrays and blobs are memory-mapped"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot format {self.manifest.get('format_version')} at {path}; "
+                f"re-export it with python snapshot.py export"
+            )
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode='r')
+        self.embeddings = load("embeddings.npy")
+        self.norms = load("norms.npy")
+        self.ids = load("ids.npy")
+        self.document_offsets = load("document_offsets.npy")
+        self.metadata_offsets = load("metadata_offsets.npy")
+        self.documents_blob = _map_file(os.path.join(path, "documents.bin"))
+        self.metadatas_blob = _map_file(os.path.join(path, "metadatas.bin"))
+        # Id lookups (answer cache validation, hybrid fusion) need a row index
+        self.rows = {str(record_id): row for row, record_id in enumerate(self.ids)}
+        self.collections = {
+            entry["key"]: SnapshotCollection(self, entry) for entry in self.manifest["collections"]
+        }
+
+    @classmethod
+    def load(cls, path: str) -> 'Snapshot':
+        snapshot = cls(path)
+        logger.info(f"Loaded snapshot: {len(snapshot)} records from {snapshot.manifest['created_at']}")
+        return snapshot
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    def document(self, row: int) -> str:
+        start, end = self.document_offsets[row], self.document_offsets[row + 1]
+        return self.documents_blob[start:end].decode('utf-8')
+
+    def metadata(self, row: int) -> Dict:
+        start, end = self.metadata_offsets[row], self.metadata_offsets[row + 1]
+        return json.loads(self.metadatas_blob[start:end])
+
+    def records(self, rows, include) -> Dict:
+        """Chroma-style column dict for the given rows"""
+        result = {'ids': [str(self.ids[row]) for row in rows]}
+        if 'documents' in include:
+            result['documents'] = [self.document(row) for row in rows]
+        if 'metadatas' in include:
+            result['metadatas'] = [self.metadata(row) for row in rows]
+        if 'embeddings' in include:
+            rows = list(rows)
+            # The original (unnormalized) embeddings, as Chroma stored them
+            result['embeddings'] = self.embeddings[rows] * self.norms[rows][:, None] if rows else []
+        return result
+
+
+class SnapshotCollection:
+    """The part of Chroma's Collection API the apps use, over a snapshot row range"""
+
+    def __init__(self, snapshot: Snapshot, entry: Dict):
+        self.snapshot = snapshot
+        self.key = entry["key"]
+        self.name = entry["name"]
+        self.metadata = entry["metadata"]
+        self.space = distance_space(self.metadata)
+        self.start = entry["start"]
+        self.end = entry["end"]
+
+    def count(self) -> int:
+        return self.end - self.start
+
+    def get(self, ids: Optional[List[str]] = None, limit: Optional[int] = None, offset: Optional[int] = None,
+            include=('documents', 'metadatas')) -> Dict:
+        if ids is not None:
+            rows = [self.snapshot.rows.get(record_id) for record_id in ids]
+            rows = [row for row in rows if row is not None and self.start <= row < self.end]
+        else:
+            first = self.start + (offset or 0)
+            last = self.end if limit is None else min(self.end, first + limit)
+            rows = range(first, last)
+        return self.snapshot.records(rows, include)
+
+    def query(self, query_embeddings, n_results: int = 10,
+              include=('documents', 'metadatas', 'distances')) -> Dict:
+        """Exact nearest neighbours, with Chroma's distance for the collection's hnsw:space"""
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        units = self.snapshot.embeddings[self.start:self.end]
+        norms = self.snapshot.norms[self.start:self.end]
+        k = min(n_results, self.count())
+        # Stored rows are unit vectors u of the original embeddings m = |m| u
+        dots = queries @ units.T
+        if self.space == 'ip':
+            distances = 1.0 - dots * norms[None, :]
+        elif self.space == 'cosine':
+            query_norms = np.linalg.norm(queries, axis=1)
+            distances = np.maximum(0.0, 1.0 - dots / np.where(query_norms == 0, 1.0, query_norms)[:, None])
+        else:
+            # |m - q|^2 = |m|^2 - 2 |m| u.q + |q|^2, without materializing differences
+            distances = np.maximum(0.0, (
+                (norms * norms)[None, :]
+                - 2.0 * dots * norms[None, :]
+                + np.einsum('ij,ij->i', queries, queries)[:, None]
+            ))
+        results = {'ids': [], 'distances': []}
+        if 'documents' in include:
+            results['documents'] = []
+        if 'metadatas' in include:
+            results['metadatas'] = []
+        for row_distances in distances:
+            if k <= 0:
+                top = np.array([], dtype=np.int64)
+            else:
+                top = np.argpartition(row_distances, k - 1)[:k]
+                top = top[np.argsort(row_distances[top], kind='stable')]
+            records = self.snapshot.records([self.start + int(i) for i in top], include)
+            for column in results:
+                if column == 'distances':
+                    results['distances'].append([float(row_distances[i]) for i in top])
+                else:
+                    results[column].append(records[column])
+        return results
+
+
+def main(argv=None):
+    import chromadb
+
+    from ingest import CHROMA_PATH
+
+    parser = argparse.ArgumentParser(description="Export or import a memory-mapped collection snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write a snapshot of the support_* collections")
+    export_parser.add_argument("--chroma-path", default=CHROMA_PATH, help="ChromaDB directory to read")
+    export_parser.add_argument("--out", help="Snapshot directory (default: index_snapshot next to the Chroma directory)")
+    import_parser = subparsers.add_parser("import", help="Load a snapshot into a ChromaDB directory")
+    import_parser.add_argument("--snapshot", required=True, help="Snapshot directory to read")
+    import_parser.add_argument("--chroma-path", default=CHROMA_PATH, help="ChromaDB directory to write")
+    args = parser.parse_args(argv)
+
+    client = chromadb.PersistentClient(path=args.chroma_path)
+    if args.command == "export":
+        export_snapshot(client, args.out or snapshot_path_for(args.chroma_path))
+    else:
+        import_snapshot(Snapshot.load(args.snapshot), client)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,71 +1,214 @@
 # migrate_data.py
-import chromadb
+"""Copy the support_* collections from one ChromaDB directory to another.
+
+Pages through each source collection and copies ids, documents, metadatas
+and embeddings verbatim (nothing is re-embedded), migrating collections in
+parallel. Progress is checkpointed after every page, so an interrupted run
+picks up where it stopped when started again. Counts are verified at the
+end and the checkpoint is removed once they match, so the shipped
+directory carries none and the next run starts from scratch.
+
+Usage:
+    python src/migrate_data.py --source /path/to/chroma_db [--dest src/data/chroma_db]
+    python src/migrate_data.py --fresh        # ignore the checkpoint and start over
+"""
+import argparse
+import json
 import os
 import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import chromadb
+
+DEFAULT_SOURCE = os.getenv('MIGRATE_SOURCE_PATH', "/Users/jayatigambhir/ikras_project/src/data/chroma_db")
+DEFAULT_DEST = "src/data/chroma_db"
+COLLECTIONS = ["support_articles", "support_tickets", "support_internal", "support_drafts"]
+PAGE_SIZE = 500
+CHECKPOINT_FILENAME = "migration_checkpoint.json"
+# Delta-sync manifests (see delta_sync.py) travel with their collections
+MANIFEST_DIR = "manifests"
+
+
+class Checkpoint:
+    """Per-collection migration progress, saved atomically after every page"""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = source
+        self.collections = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, source):
+        checkpoint = cls(path, source)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return checkpoint
+        if data.get("source") != os.path.abspath(source):
+            raise ValueError(
+                f"Checkpoint {path} is for source {data.get('source')}; run with --fresh to start over"
+            )
+        checkpoint.collections = data.get("collections", {})
+        return checkpoint
+
+    def get(self, name):
+        with self._lock:
+            return dict(self.collections.get(name) or {"offset": 0, "done": False})
+
+    def update(self, name, **progress):
+        with self._lock:
+            self.collections.setdefault(name, {"offset": 0, "done": False}).update(progress)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"source": os.path.abspath(self.source), "collections": self.collections}, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def migrate_collection(source_db, dest_db, name, checkpoint, page_size=PAGE_SIZE):
+    """Copy one collection page by page, resuming from its checkpoint"""
+    try:
+        source_collection = source_db.get_collection(name)
+    except Exception as e:
+        print(f"Source collection {name} not found: {str(e)}")
+        return None
+
+    total = source_collection.count()
+    progress = checkpoint.get(name)
+    if progress["done"]:
+        print(f"{name}: already migrated ({progress['offset']} documents)")
+        return progress["offset"]
+
+    dest_collection = dest_db.get_or_create_collection(name, metadata=source_collection.metadata)
+    offset = progress["offset"]
+    if offset:
+        print(f"{name}: resuming at {offset} of {total}")
+    start_time = time.time()
 
-def migrate_data():
+    while True:
+        page = source_collection.get(
+            limit=page_size,
+            offset=offset,
+            include=['documents', 'metadatas', 'embeddings']
+        )
+        if not len(page['ids']):
+            break
+        # upsert, so a page replayed after a crash does not fail on existing ids
+        dest_collection.upsert(
+            ids=page['ids'],
+            documents=page['documents'],
+            metadatas=page['metadatas'],
+            embeddings=page['embeddings']
+        )
+        offset += len(page['ids'])
+        checkpoint.update(name, offset=offset)
+
+        elapsed = time.time() - start_time
+        rate = (offset - progress["offset"]) / elapsed if elapsed > 0 else 0
+        print(f"{name}: {offset}/{total} documents ({rate:.0f} docs/sec)")
+
+    checkpoint.update(name, offset=offset, done=True)
+    return offset
+
+
+def copy_manifest(source_path, dest_path, name):
+    source_manifest = os.path.join(source_path, MANIFEST_DIR, f"{name}.json")
+    if os.path.exists(source_manifest):
+        os.makedirs(os.path.join(dest_path, MANIFEST_DIR), exist_ok=True)
+        shutil.copy2(source_manifest, os.path.join(dest_path, MANIFEST_DIR, f"{name}.json"))
+
+
+def verify_counts(source_db, dest_db, names):
+    """Compare document counts per collection; returns True when all match"""
+    ok = True
+    for name in names:
+        try:
+            source_count = source_db.get_collection(name).count()
+        except Exception:
+            continue
+        try:
+            dest_count = dest_db.get_collection(name).count()
+        except Exception:
+            dest_count = 0
+        status = "OK" if source_count == dest_count else "MISMATCH"
+        ok = ok and source_count == dest_count
+        print(f"{name}: source {source_count}, destination {dest_count} [{status}]")
+    return ok
+
+
+def migrate_data(source_path=DEFAULT_SOURCE, dest_path=DEFAULT_DEST, collections=COLLECTIONS,
+                 page_size=PAGE_SIZE, workers=len(COLLECTIONS), fresh=False):
     print("Starting migration...")
-    
-    # Source (your local ChromaDB)
-    source_path = "/Users/jayatigambhir/ikras_project/src/data/chroma_db"
     print(f"Source path: {source_path}")
     source_db = chromadb.PersistentClient(path=source_path)
-    
+
     # Destination (for Railway)
-    temp_path = "src/data/chroma_db"
-    if os.path.exists(temp_path):
-        print(f"Removing existing {temp_path}")
-        shutil.rmtree(temp_path)
-    print(f"Creating {temp_path}")
-    os.makedirs(temp_path)
-    
-    dest_db = chromadb.PersistentClient(path=temp_path)
-    
-    # Migrate each collection
-    collections = ["support_articles", "support_tickets", "support_internal", "support_drafts"]
-    
-    for coll_name in collections:
-        print(f"\nMigrating {coll_name}...")
-        try:
-            # Get source collection if exists
+    checkpoint_path = os.path.join(dest_path, CHECKPOINT_FILENAME)
+    if os.path.exists(dest_path) and (fresh or not os.path.exists(checkpoint_path)):
+        print(f"Removing existing {dest_path}")
+        shutil.rmtree(dest_path)
+    os.makedirs(dest_path, exist_ok=True)
+    checkpoint = Checkpoint.load(checkpoint_path, source_path)
+    dest_db = chromadb.PersistentClient(path=dest_path)
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            name: executor.submit(migrate_collection, source_db, dest_db, name, checkpoint, page_size)
+            for name in collections
+        }
+        for name, future in futures.items():
             try:
-                source_collection = source_db.get_collection(coll_name)
-                print(f"Found source collection: {coll_name}")
+                if future.result() is not None:
+                    copy_manifest(source_path, dest_path, name)
             except Exception as e:
-                print(f"Source collection {coll_name} not found: {str(e)}")
-                continue
-            
-            # Create destination collection
-            dest_collection = dest_db.create_collection(coll_name)
-            print(f"Created destination collection: {coll_name}")
-            
-            # Get all data from source
-            results = source_collection.get()
-            
-            if results['ids']:
-                # Add to destination in smaller batches
-                batch_size = 100
-                total_docs = len(results['ids'])
-                
-                for i in range(0, total_docs, batch_size):
-                    end_idx = min(i + batch_size, total_docs)
-                    print(f"Processing batch {i}-{end_idx} of {total_docs}")
-                    
-                    dest_collection.add(
-                        documents=results['documents'][i:end_idx],
-                        metadatas=results['metadatas'][i:end_idx],
-                        ids=results['ids'][i:end_idx]
-                    )
-                print(f"Migrated {total_docs} documents for {coll_name}")
-            else:
-                print(f"No documents found in {coll_name}")
-            
-        except Exception as e:
-            print(f"Error migrating {coll_name}: {str(e)}")
-            continue
-    
-    print("\nMigration complete!")
-    print(f"Data migrated to: {os.path.abspath(temp_path)}")
+                print(f"Error migrating {name}: {str(e)} (run again to resume)")
+
+    print("\nVerifying document counts...")
+    ok = verify_counts(source_db, dest_db, collections)
+    if ok:
+        # Only interrupted or mismatched runs keep their checkpoint to resume from
+        checkpoint.remove()
+    print(f"\nMigration {'complete' if ok else 'finished with mismatches'} in {time.time() - start_time:.2f} seconds")
+    print(f"Data migrated to: {os.path.abspath(dest_path)}")
+    return ok
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Copy ChromaDB collections with their embeddings")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="Source ChromaDB directory")
+    parser.add_argument("--dest", default=DEFAULT_DEST, help="Destination ChromaDB directory")
+    parser.add_argument(
+        "--collections",
+        nargs="+",
+        default=COLLECTIONS,
+        metavar="name",
+        help="Collections to migrate (default: all support_* collections)"
+    )
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="Documents read per page")
+    parser.add_argument("--workers", type=int, default=len(COLLECTIONS), help="Collections migrated at once")
+    parser.add_argument("--fresh", action="store_true", help="Discard the checkpoint and destination first")
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    migrate_data()
+    args = parse_args()
+    ok = migrate_data(
+        source_path=args.source,
+        dest_path=args.dest,
+        collections=args.collections,
+        page_size=args.page_size,
+        workers=args.workers,
+        fresh=args.fresh
+    )
+    sys.exit(0 if ok else 1)
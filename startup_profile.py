@@ -0,0 +1,43 @@
+# startup_profile.py
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """Wall-clock seconds spent in each startup phase, in the order they ran"""
+
+    def __init__(self):
+        self.phases = []
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self.phases.append((name, seconds))
+        logger.info(f"Startup phase {name}: {seconds:.3f}s")
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            phases = list(self.phases)
+        return {
+            # A list, so JSON responses keep the order the phases ran in
+            "phases": [{"phase": name, "seconds": round(seconds, 3)} for name, seconds in phases],
+            "total_seconds": round(sum(seconds for _, seconds in phases), 3)
+        }
+
+    def summary(self) -> str:
+        profile = self.as_dict()
+        phases = ", ".join(f"{phase['phase']} {phase['seconds']:.2f}s" for phase in profile["phases"])
+        return f"Startup profile ({profile['total_seconds']:.2f}s): {phases}"
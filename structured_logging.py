@@ -0,0 +1,321 @@
+# structured_logging.py
+"""Non-blocking JSON logging for the web apps.
+
+Request threads only put records on a bounded queue; a background
+listener drains it in batches, formats each record as one JSON line
+(fields passed with ``extra=`` included) and writes every batch to stdout
+and a size-rotated log file with one write and one flush per destination.
+When the queue is full records are dropped and counted rather than
+blocking the request. After a fork (gunicorn workers) each process gets
+its own listener and file handle; workers append to the same file, rotate
+it under a lock file (<LOG_FILE>.lock) and reopen it when another worker
+has rotated it. Chatty loggers can be sampled below a level:
+
+    LOG_SAMPLING="chromadb=0.01,urllib3=0.1"   # keep 1% / 10% of their DEBUG records
+
+Settings: LOG_LEVEL, LOG_FORMAT (json|text), LOG_FILE (empty disables the
+file), LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_QUEUE_SIZE, LOG_BATCH_SIZE,
+LOG_FLUSH_INTERVAL, LOG_SAMPLING, LOG_SAMPLE_MAX_LEVEL.
+"""
+import atexit
+import fcntl
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+LOG_FILE = os.getenv('LOG_FILE', 'app_logs.log')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', '256'))
+# Seconds the listener waits to fill a batch once it has a record
+LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', '0.2'))
+LOG_SAMPLING = os.getenv('LOG_SAMPLING', '')
+# Records at or below this level from sampled loggers are sampled
+LOG_SAMPLE_MAX_LEVEL = os.getenv('LOG_SAMPLE_MAX_LEVEL', 'DEBUG').upper()
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else came from extra=
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """'name=rate,name=rate' -> {name: rate}"""
+    rates = {}
+    for part in spec.split(','):
+        if '=' in part:
+            name, rate = part.split('=', 1)
+            rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of low-level records from the configured loggers (and their children)"""
+
+    def __init__(self, rates: Dict[str, float], max_level: int = logging.DEBUG):
+        super().__init__()
+        self.rates = rates
+        self.max_level = max_level
+        self.sampled_out = 0
+
+    def _rate(self, name: str) -> Optional[float]:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        if rate is None or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class QueueHandler(logging.Handler):
+    """Hand records to the listener without formatting or I/O on the caller's thread"""
+
+    def __init__(self, records: 'queue.Queue'):
+        super().__init__()
+        self.queue = records
+        self.dropped = 0
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            # Resolve the message and traceback now: args and exc_info may
+            # not survive until the listener formats the record
+            record.message = record.getMessage()
+            if record.exc_info and not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.msg, record.args, record.exc_info = record.message, None, None
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+
+class RotatingFileWriter:
+    """Append-only log file rotated to .1 ... .N once it passes max_bytes.
+
+    Safe to share between processes: rotation holds an exclusive lock on
+    <path>.lock, and a writer whose file was rotated by another process
+    reopens the path before its next write.
+    """
+
+    def __init__(self, path: str, max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._open()
+
+    def _open(self):
+        self.stream = open(self.path, 'a', encoding='utf-8')
+        self._inode = os.fstat(self.stream.fileno()).st_ino
+
+    def _reopen_if_moved(self):
+        try:
+            moved = os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            moved = True
+        if moved:
+            self.stream.close()
+            self._open()
+
+    def _needs_rotation(self, incoming: int) -> bool:
+        size = os.fstat(self.stream.fileno()).st_size
+        return bool(self.max_bytes and size and size + incoming > self.max_bytes)
+
+    def write(self, text: str):
+        self._reopen_if_moved()
+        if self._needs_rotation(len(text)):
+            self.rotate(len(text))
+        self.stream.write(text)
+        self.stream.flush()
+
+    def rotate(self, incoming: int = 0):
+        with open(f"{self.path}.lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Another process may have rotated the file while we waited
+            self._reopen_if_moved()
+            if not self._needs_rotation(incoming):
+                return
+            self.stream.close()
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            if self.backup_count:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+            self._open()
+
+    def close(self):
+        self.stream.close()
+
+
+class _ConsoleWriter:
+    def write(self, text: str):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    def close(self):
+        pass
+
+
+class BatchingListener:
+    """Background thread that drains the queue and writes records in batches"""
+
+    def __init__(self, records: 'queue.Queue', formatter: logging.Formatter, writers: List,
+                 batch_size: int = LOG_BATCH_SIZE, flush_interval: float = LOG_FLUSH_INTERVAL):
+        self.queue = records
+        self.formatter = formatter
+        self.writers = writers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.batches = 0
+        self.written = 0
+        self._stop = object()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write what is queued, then end the thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put(self._stop)
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not self._stop:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is self._stop
+            self._write([record for record in batch if record is not self._stop])
+            if stopping:
+                return
+
+    def _write(self, records: List[logging.LogRecord]):
+        if not records:
+            return
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception as e:
+                lines.append(f"Unformattable log record from {record.name}: {e}")
+        text = "\n".join(lines) + "\n"
+        for writer in self.writers:
+            try:
+                writer.write(text)
+            except Exception as e:
+                sys.stderr.write(f"Log write failed: {e}\n")
+        self.batches += 1
+        self.written += len(records)
+
+
+_handler = None
+_listener = None
+_sampler = None
+
+
+def _start_listener():
+    global _listener
+    records = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    writers = [_ConsoleWriter()]
+    if LOG_FILE:
+        writers.append(RotatingFileWriter(LOG_FILE))
+    formatter = JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT)
+    _listener = BatchingListener(records, formatter, writers)
+    _handler.queue = records
+    _listener.start()
+
+
+def _restart_after_fork():
+    # The listener thread does not survive fork(); close the inherited file
+    # handles and give the child its own queue, writers and thread (the
+    # parent's queue may be mid-write)
+    if _listener is not None:
+        for writer in _listener.writers:
+            writer.close()
+        _start_listener()
+
+
+def setup_logging():
+    """Route the root logger through the queue; safe to call more than once"""
+    global _handler, _sampler
+    if _handler is not None:
+        return
+    _handler = QueueHandler(queue.Queue())
+    _sampler = SamplingFilter(parse_sampling(LOG_SAMPLING), logging.getLevelName(LOG_SAMPLE_MAX_LEVEL))
+    _handler.addFilter(_sampler)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(LOG_LEVEL)
+
+    _start_listener()
+    atexit.register(shutdown_logging)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def shutdown_logging():
+    if _listener is not None:
+        _listener.stop()
+        for writer in _listener.writers:
+            writer.close()
+
+
+def logging_stats() -> Dict:
+    return {
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+        "sampled_out": _sampler.sampled_out if _sampler else 0,
+        "written": _listener.written if _listener else 0,
+        "batches": _listener.batches if _listener else 0
+    }
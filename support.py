@@ -0,0 +1,447 @@
+# support.py
+"""The SupportSystem behind app.py's answer endpoints.
+
+Imports chromadb, anthropic and numpy, so app.py loads it in the
+background (or in the gunicorn master when preloading) rather than at
+import time, letting / and /health answer while it starts.
+"""
+import logging
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import chromadb
+from anthropic import Anthropic, APITimeoutError
+
+from admission import AdmissionController, Overloaded
+from answer_cache import AnswerCache, normalize_question
+from answering import DEADLINE_ANSWER, NO_CONTEXT_ANSWER, generate_answer, stream_answer
+from context_packer import pack_context
+from deadline import MIN_GENERATE_SECONDS, Deadline, DeadlineExceeded
+from embedding_cache import get_embedding_function, preload_embedding_function, reset_embedding_function
+from lexical_index import LexicalIndex, index_path_for
+from metrics import CACHE_LOOKUPS, COALESCED, DEADLINE_EXCEEDED, observe_references
+from numpy_backend import NumpyBackend
+from request_timings import RequestTimings
+from retrieval import (
+    COLLECTIONS,
+    batch_fan_out_query,
+    fan_out_query,
+    preload_collections,
+    public_reference,
+    release_connections,
+)
+from single_flight import SingleFlight
+from snapshot import Snapshot
+from startup_profile import StartupProfile
+
+logger = logging.getLogger(__name__)
+
+BATCH_LLM_CONCURRENCY = int(os.getenv('BATCH_LLM_CONCURRENCY', '8'))
+# Retrieval (no Claude call) run by each worker before it reports ready
+WARMUP_QUESTION = os.getenv('WARMUP_QUESTION', 'How do I renew my license?')
+# Serve from a memory-mapped snapshot (snapshot.py export) instead of Chroma
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH')
+# 'chroma' queries each collection through its client; 'numpy' searches an
+# in-process matrix of every collection at once (numpy_backend.py)
+RETRIEVAL_BACKEND = os.getenv('RETRIEVAL_BACKEND', 'chroma').lower()
+# Concurrent identical questions share one retrieval and Claude call
+COALESCE_QUESTIONS = os.getenv('COALESCE_QUESTIONS', '1') != '0'
+
+
+class SupportSystem:
+    def __init__(self, profile: Optional[StartupProfile] = None):
+        logger.info("Initializing SupportSystem...")
+        self.profile = profile or StartupProfile()
+        try:
+            # Initialize ChromaDB, or map the snapshot read-only in its place
+            with self.profile.phase('db_open'):
+                if SNAPSHOT_PATH:
+                    data_path = SNAPSHOT_PATH
+                    self.db = None
+                    snapshot = Snapshot.load(SNAPSHOT_PATH)
+                else:
+                    data_path = os.getenv('CHROMA_PATH', '/app/data/chroma_db')
+                    os.makedirs(data_path, exist_ok=True)
+                    self.db = chromadb.PersistentClient(path=data_path)
+
+            # Same embedding model the loaders used, so questions are embedded once
+            with self.profile.phase('embedding_function'):
+                self.embedding_function = get_embedding_function()
+
+            with self.profile.phase('collections'):
+                if RETRIEVAL_BACKEND == 'numpy':
+                    if self.db is None:
+                        self.collections = NumpyBackend.from_snapshot(snapshot)
+                    else:
+                        self.collections = NumpyBackend.from_chroma(self.db)
+                elif RETRIEVAL_BACKEND != 'chroma':
+                    raise ValueError(f"Unknown RETRIEVAL_BACKEND {RETRIEVAL_BACKEND!r} (expected chroma or numpy)")
+                elif self.db is None:
+                    self.collections = snapshot.collections
+                else:
+                    self.collections = {
+                        key: self.db.get_or_create_collection(name, embedding_function=self.embedding_function)
+                        for key, name in COLLECTIONS.items()
+                    }
+
+            # BM25 index built by ingest.py, fused with vector hits when present
+            with self.profile.phase('lexical_index'):
+                self.lexical_index = LexicalIndex.load(index_path_for(data_path))
+
+            # Initialize Claude (Anthropic API)
+            with self.profile.phase('anthropic_client'):
+                self.client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+
+            # Serve repeated and near-duplicate questions without a Claude call
+            self.answer_cache = AnswerCache()
+            # ...and identical questions asked while the first is still being answered
+            self.in_flight = SingleFlight() if COALESCE_QUESTIONS else None
+            # Bounds concurrent Claude calls; excess requests queue briefly, then get 429
+            self.admission = AdmissionController()
+
+            # Readiness: set once a warm-up query has gone through this process
+            self.ready = False
+            self.warmup_seconds = None
+            self.warmup_error = None
+
+            logger.info("SupportSystem initialized successfully.")
+        except Exception as e:
+            logger.critical(f"Initialization error: {e}")
+            logger.critical(traceback.format_exc())
+            raise
+
+    def preload(self):
+        """Load shared read-only state in the gunicorn master before it forks.
+
+        Loads every collection's vector index and the embedding model files,
+        then closes the master's SQLite connections. Nothing here starts a
+        thread or runs the model, so workers inherit it copy-on-write.
+        """
+        with self.profile.phase('preload'):
+            preload_collections(self.collections)
+            preload_embedding_function(self.embedding_function)
+            if self.db is not None:
+                release_connections(self.db)
+
+    def after_fork(self):
+        """Give a forked worker its own model session and API client, then warm up."""
+        reset_embedding_function(self.embedding_function)
+        self.client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+        self.start_warm_up()
+
+    def warm_up(self):
+        """Embed and retrieve for a canned question, then mark this process ready."""
+        start = time.time()
+        try:
+            with self.profile.phase('warm_up'):
+                query_embedding = self.embed_question(WARMUP_QUESTION)
+                fan_out_query(
+                    self.collections, query_embedding, question=WARMUP_QUESTION, lexical_index=self.lexical_index
+                )
+        except Exception as e:
+            self.warmup_error = str(e)
+            logger.error(f"Warm-up query failed: {e}")
+            return
+        self.warmup_seconds = round(time.time() - start, 3)
+        self.ready = True
+        logger.info(f"Ready; {self.profile.summary()}")
+
+    def start_warm_up(self):
+        threading.Thread(target=self.warm_up, name='warm-up', daemon=True).start()
+
+    def embed_question(self, question: str) -> List[float]:
+        """Embed a question once for use against every collection."""
+        return self.embed_questions([question])[0]
+
+    def embed_questions(self, questions: List[str]) -> List[List[float]]:
+        """Embed several questions in one call to the embedding model."""
+        return [[float(x) for x in vector] for vector in self.embedding_function(questions)]
+
+    def _cached_answer(self, question: str, timings: RequestTimings) -> Tuple[Optional[Dict], str, Optional[List[float]]]:
+        """Look the question up in the answer cache.
+
+        Returns the cached result (or None), the normalized question and the
+        query embedding (None on an exact hit, which needs no embedding).
+        """
+        normalized = normalize_question(question)
+        with timings.stage('cache'):
+            cached = self.answer_cache.get_exact(normalized, self.collections)
+        if cached is not None:
+            logger.info("Answer cache hit (exact)")
+            CACHE_LOOKUPS.inc(result='exact')
+            return cached, normalized, None
+
+        with timings.stage('embed'):
+            query_embedding = self.embed_question(question)
+        with timings.stage('cache'):
+            cached = self.answer_cache.get_similar(query_embedding, self.collections)
+        if cached is not None:
+            logger.info("Answer cache hit (similar question)")
+        CACHE_LOOKUPS.inc(result='similar' if cached is not None else 'miss')
+        return cached, normalized, query_embedding
+
+    def answer_question(self, question: str, timings: Optional[RequestTimings] = None,
+                        deadline: Optional[Deadline] = None) -> Dict:
+        """Retrieve references from all collections and answer with Claude.
+
+        The result carries ``timings``: milliseconds per stage (cache, embed,
+        retrieve, pack, generate) and in total. A question that normalizes
+        the same as one already being answered waits for that answer
+        instead (its wait is the ``coalesced`` stage), and answers itself if
+        that answer came back partial.
+
+        Under a ``deadline``, collections that miss retrieval's share of it
+        are left out, and when Claude cannot answer in what is left the
+        result has DEADLINE_ANSWER with the references. Either way it then
+        has a ``partial`` entry saying what was cut, and is not cached.
+        Raises DeadlineExceeded if an identical question in flight does not
+        finish in time.
+        """
+        timings = timings or RequestTimings()
+        if self.in_flight is None:
+            return {**self._answer(question, timings, deadline), 'timings': timings.as_dict()}
+
+        started = time.perf_counter()
+        try:
+            result, shared = self.in_flight.do(
+                normalize_question(question), lambda: self._answer(question, timings, deadline),
+                timeout=deadline.remaining() if deadline else None
+            )
+        except TimeoutError as e:
+            DEADLINE_EXCEEDED.inc(stage='coalesced')
+            raise DeadlineExceeded(str(e)) from e
+        if shared:
+            timings.record('coalesced', time.perf_counter() - started)
+            if 'partial' in result:
+                # Cut short by the other caller's deadline, which may be tighter than ours
+                result = self._answer(question, timings, deadline)
+            else:
+                COALESCED.inc()
+                logger.info("Shared the answer of an identical question in flight")
+        return {**result, 'timings': timings.as_dict()}
+
+    def _answer(self, question: str, timings: RequestTimings, deadline: Optional[Deadline] = None) -> Dict:
+        cached, normalized, query_embedding = self._cached_answer(question, timings)
+        if cached is not None:
+            return cached
+
+        timed_out = []
+        with timings.stage('retrieve'):
+            retrieved = fan_out_query(
+                self.collections, query_embedding, question=question, lexical_index=self.lexical_index,
+                timings=timings, timeout=deadline.retrieval_timeout() if deadline else None, timed_out=timed_out
+            )
+        with timings.stage('pack'):
+            references, context = pack_context(retrieved)
+        observe_references(retrieved, references)
+        logger.info(f"Packed {len(references)} references into {context['tokens']}/{context['budget']} context tokens")
+
+        try:
+            answer, answered = self._generate(question, references, timings, deadline), True
+        except DeadlineExceeded as e:
+            logger.warning(f"Returning references only: {e}")
+            answer, answered = DEADLINE_ANSWER, False
+        result = {
+            'answer': answer,
+            'references': [public_reference(ref) for ref in references],
+            'context': context
+        }
+        if timed_out or not answered:
+            result['partial'] = {'collections_timed_out': timed_out, 'answer_timed_out': not answered}
+        else:
+            self.answer_cache.put(normalized, query_embedding, result, references)
+        return result
+
+    def _generate(self, question: str, references: List[Dict], timings: Optional[RequestTimings] = None,
+                  deadline: Optional[Deadline] = None) -> str:
+        """generate_answer in an admission slot.
+
+        Raises Overloaded when no slot is free, DeadlineExceeded when the
+        deadline runs out before or during the Claude call.
+        """
+        if not references:
+            return NO_CONTEXT_ANSWER
+        timings = timings or RequestTimings()
+        with self._claude_slot(timings, deadline):
+            with timings.stage('generate'):
+                return generate_answer(
+                    self.client, question, references,
+                    timeout=deadline.remaining() if deadline else None
+                )
+
+    @contextmanager
+    def _claude_slot(self, timings: RequestTimings, deadline: Optional[Deadline] = None):
+        """Hold an admission slot for a Claude call made in the block.
+
+        Under a deadline, waits for the slot only as long as still leaves
+        time to answer, and turns a queue timeout or a Claude timeout into
+        DeadlineExceeded.
+        """
+        max_wait = None
+        if deadline is not None:
+            try:
+                max_wait = deadline.generation_timeout() - MIN_GENERATE_SECONDS
+            except DeadlineExceeded:
+                DEADLINE_EXCEEDED.inc(stage='generate')
+                raise
+        queued = time.perf_counter()
+        try:
+            with self.admission.slot(max_wait):
+                timings.record('queue', time.perf_counter() - queued)
+                yield
+        except Overloaded as e:
+            if e.reason == 'timeout' and max_wait is not None and max_wait < self.admission.max_wait:
+                DEADLINE_EXCEEDED.inc(stage='queue')
+                raise DeadlineExceeded(f"No Claude slot within the {deadline.seconds:g}s deadline") from e
+            raise
+        except APITimeoutError as e:
+            if deadline is None:
+                raise
+            DEADLINE_EXCEEDED.inc(stage='generate')
+            raise DeadlineExceeded(f"Claude did not answer within the {deadline.seconds:g}s deadline") from e
+
+    def answer_questions(self, questions: List[str], max_concurrency: int = BATCH_LLM_CONCURRENCY,
+                         deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Answer many questions with shared embedding and retrieval.
+
+        Duplicate questions (after normalization) are answered once. Cache
+        misses are embedded in one batch and retrieved with batched
+        collection queries, then Claude is called with bounded concurrency.
+        Returns one {'result': ...} or {'error': ...} per question, in order.
+
+        A ``deadline`` covers the whole batch, as in answer_question: slow
+        collections are left out and questions Claude cannot answer in time
+        get DEADLINE_ANSWER with their references and a ``partial`` entry.
+        """
+        unique = {}
+        for question in questions:
+            unique.setdefault(normalize_question(question), question)
+
+        outcomes = {}
+        pending = []
+        for normalized in unique:
+            cached = self.answer_cache.get_exact(normalized, self.collections)
+            if cached is not None:
+                CACHE_LOOKUPS.inc(result='exact')
+                outcomes[normalized] = {'result': cached}
+            else:
+                pending.append(normalized)
+
+        to_answer = []
+        if pending:
+            embeddings = self.embed_questions([unique[normalized] for normalized in pending])
+            for normalized, query_embedding in zip(pending, embeddings):
+                cached = self.answer_cache.get_similar(query_embedding, self.collections)
+                CACHE_LOOKUPS.inc(result='similar' if cached is not None else 'miss')
+                if cached is not None:
+                    outcomes[normalized] = {'result': cached}
+                else:
+                    to_answer.append((normalized, query_embedding))
+
+        if to_answer:
+            timed_out = []
+            reference_lists = batch_fan_out_query(
+                self.collections,
+                [emb for _, emb in to_answer],
+                questions=[unique[normalized] for normalized, _ in to_answer],
+                lexical_index=self.lexical_index,
+                timeout=deadline.retrieval_timeout() if deadline else None,
+                timed_out=timed_out
+            )
+            logger.info(f"Batch retrieved references for {len(to_answer)} questions")
+            packed = [pack_context(references) for references in reference_lists]
+            for retrieved, (references, _) in zip(reference_lists, packed):
+                observe_references(retrieved, references)
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+                futures = [
+                    (normalized, query_embedding, references, context,
+                     pool.submit(self._generate, unique[normalized], references, None, deadline))
+                    for (normalized, query_embedding), (references, context) in zip(to_answer, packed)
+                ]
+                for normalized, query_embedding, references, context, future in futures:
+                    answered = True
+                    try:
+                        answer = future.result()
+                    except DeadlineExceeded as e:
+                        logger.warning(f"Returning references only for a batch question: {e}")
+                        answer, answered = DEADLINE_ANSWER, False
+                    except Exception as e:
+                        logger.error(f"Error answering batch question: {e}")
+                        outcomes[normalized] = {'error': str(e)}
+                        continue
+                    result = {
+                        'answer': answer,
+                        'references': [public_reference(ref) for ref in references],
+                        'context': context
+                    }
+                    if timed_out or not answered:
+                        result['partial'] = {'collections_timed_out': timed_out, 'answer_timed_out': not answered}
+                    else:
+                        self.answer_cache.put(normalized, query_embedding, result, references)
+                    outcomes[normalized] = {'result': result}
+
+        return [outcomes[normalize_question(question)] for question in questions]
+
+    def stream_answer(self, question: str, timings: Optional[RequestTimings] = None,
+                      deadline: Optional[Deadline] = None) -> Iterator[Tuple[str, object]]:
+        """Answer a question incrementally.
+
+        Yields ('references', refs) as soon as retrieval finishes, then
+        ('token', text) chunks as Claude generates them, then ('done', result).
+
+        Under a ``deadline`` slow collections are left out, and Claude stops
+        when it runs out: the text streamed so far is the answer, or
+        DEADLINE_ANSWER if there was none. The result then has ``partial``
+        as in answer_question and is not cached.
+        """
+        timings = timings or RequestTimings()
+        cached, normalized, query_embedding = self._cached_answer(question, timings)
+        if cached is not None:
+            yield 'references', cached['references']
+            yield 'token', cached['answer']
+            yield 'done', {**cached, 'timings': timings.as_dict()}
+            return
+
+        timed_out = []
+        with timings.stage('retrieve'):
+            retrieved = fan_out_query(
+                self.collections, query_embedding, question=question, lexical_index=self.lexical_index,
+                timings=timings, timeout=deadline.retrieval_timeout() if deadline else None, timed_out=timed_out
+            )
+        with timings.stage('pack'):
+            references, context = pack_context(retrieved)
+        observe_references(retrieved, references)
+        public_references = [public_reference(ref) for ref in references]
+        yield 'references', public_references
+
+        chunks = []
+        answered = True
+        try:
+            with self._claude_slot(timings, deadline) if references else nullcontext():
+                with timings.stage('generate'):
+                    for text in stream_answer(self.client, question, references,
+                                              timeout=deadline.remaining() if deadline else None):
+                        chunks.append(text)
+                        yield 'token', text
+        except DeadlineExceeded as e:
+            logger.warning(f"Stopping the streamed answer: {e}")
+            answered = False
+            if not chunks:
+                chunks.append(DEADLINE_ANSWER)
+                yield 'token', DEADLINE_ANSWER
+
+        result = {
+            'answer': ''.join(chunks).strip(),
+            'references': public_references,
+            'context': context
+        }
+        if timed_out or not answered:
+            result['partial'] = {'collections_timed_out': timed_out, 'answer_timed_out': not answered}
+        else:
+            self.answer_cache.put(normalized, query_embedding, result, references)
+        yield 'done', {**result, 'timings': timings.as_dict()}
@@ -0,0 +1,157 @@
+# zendesk_reader.py
+import codecs
+import json
+import os
+
+# Bytes read from disk per refill of the parse buffer
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+# Characters that can follow a complete value inside an export
+_VALUE_END = _WHITESPACE + ',:]}'
+
+
+class ExportReader:
+    """Stream items out of a Zendesk export one at a time.
+
+    Zendesk exports look like ``{"count": ..., "articles": [{...}, ...]}``.
+    Instead of ``json.load``-ing the whole file, the reader keeps a small
+    text buffer, decodes one array element at a time with
+    ``json.JSONDecoder.raw_decode`` and discards it once yielded, so memory
+    stays bounded by about twice the largest single item rather than the
+    export size.
+    A bare top-level array is also accepted.
+
+    Progress is tracked from the byte offset into the file, so callers can
+    report how far along they are without parsing the file twice.
+    """
+
+    def __init__(self, file_path, key, chunk_size=CHUNK_SIZE):
+        self.file_path = file_path
+        self.key = key
+        self.chunk_size = chunk_size
+        self.total_bytes = os.path.getsize(file_path)
+        self.bytes_read = 0
+        self.items_read = 0
+
+    @property
+    def percent(self):
+        """Percentage of the file consumed so far"""
+        if not self.total_bytes:
+            return 100.0
+        return 100.0 * self.bytes_read / self.total_bytes
+
+    def progress(self):
+        """Human readable progress string for log lines"""
+        return f"{self.percent:.1f}% of {self.total_bytes / (1024 * 1024):.1f} MB"
+
+    def __iter__(self):
+        self.bytes_read = 0
+        self.items_read = 0
+        with open(self.file_path, 'rb') as f:
+            parser = _StreamParser(f, self)
+            for item in parser.items(self.key):
+                self.items_read += 1
+                yield item
+
+
+class _StreamParser:
+    """Minimal incremental JSON walker over a binary file object"""
+
+    def __init__(self, f, reader):
+        self.f = f
+        self.reader = reader
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=0):
+        """Read another chunk (at least ``size`` bytes) into the buffer, dropping consumed text"""
+        if self.eof:
+            return False
+        chunk = self.f.read(max(self.reader.chunk_size, size))
+        self.reader.bytes_read += len(chunk)
+        if not chunk:
+            self.eof = True
+            self.buf = self.buf[self.pos:] + self.text_decoder.decode(b'', final=True)
+            self.pos = 0
+            return False
+        self.buf = self.buf[self.pos:] + self.text_decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars):
+        char = self._peek()
+        if char not in chars:
+            raise ValueError(
+                f"Malformed export {self.reader.file_path}: expected one of "
+                f"{chars!r}, found {char or 'end of file'!r}"
+            )
+        self.pos += 1
+        return char
+
+    def _value(self):
+        """Decode the next complete JSON value"""
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number cut by the buffer end decodes short ("1." as 1, "12" of
+                # "123"), so only trust a value once the delimiter after it is read
+                if self.eof or (end < len(self.buf) and self.buf[end] in _VALUE_END):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Each attempt decodes the value from its start again, so at least
+            # double the pending text first: linear rather than quadratic in
+            # the size of a large item
+            self._fill(len(self.buf) - self.pos)
+
+    def _array_items(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._expect(',]') == ']':
+                return
+
+    def items(self, key):
+        first = self._peek()
+        if first == '[':
+            yield from self._array_items()
+            return
+
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            name = self._value()
+            self._expect(':')
+            if name == key and self._peek() == '[':
+                yield from self._array_items()
+                return
+            # Skip over unrelated top-level fields (count, next_page, ...)
+            self._value()
+            if self._expect(',}') == '}':
+                return
+
+
+def iter_items(file_path, key):
+    """Convenience generator over the ``key`` array of an export file"""
+    return iter(ExportReader(file_path, key))